@@ -0,0 +1,417 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import parse_qs, urlencode, urlsplit
+from synthetic import SyntheticOrg, presets, parse_iso, parse_time
+
+API_PREFIX = "/api/v1"
+
+# (path regex, operation), the operation names the handler methods
+routes = [
+    (r"/organizations", "getOrganizations"),
+    (r"/organizations/(?P<org>[^/]+)/networks", "getOrganizationNetworks"),
+    (r"/organizations/(?P<org>[^/]+)/devices", "getOrganizationDevices"),
+    (
+        r"/organizations/(?P<org>[^/]+)/devices/availabilities",
+        "getOrganizationDevicesAvailabilities",
+    ),
+    (
+        r"/organizations/(?P<org>[^/]+)/devices/availabilities/changeHistory",
+        "getOrganizationDevicesAvailabilitiesChangeHistory",
+    ),
+    (
+        r"/organizations/(?P<org>[^/]+)/appliance/uplink/statuses",
+        "getOrganizationApplianceUplinkStatuses",
+    ),
+    (r"/organizations/(?P<org>[^/]+)/admins", "getOrganizationAdmins"),
+    (r"/organizations/(?P<org>[^/]+)/apiRequests", "getOrganizationApiRequests"),
+    (
+        r"/organizations/(?P<org>[^/]+)/apiRequests/overview",
+        "getOrganizationApiRequestsOverview",
+    ),
+    (
+        r"/organizations/(?P<org>[^/]+)/assurance/alerts",
+        "getOrganizationAssuranceAlerts",
+    ),
+    (
+        r"/organizations/(?P<org>[^/]+)/configurationChanges",
+        "getOrganizationConfigurationChanges",
+    ),
+    (
+        r"/organizations/(?P<org>[^/]+)/integrations/xdr/networks",
+        "getOrganizationIntegrationsXdrNetworks",
+    ),
+    (r"/networks/(?P<network>[^/]+)/events", "getNetworkEvents"),
+    (r"/networks/(?P<network>[^/]+)/events/eventTypes", "getNetworkEventsEventTypes"),
+    (
+        r"/networks/(?P<network>[^/]+)/appliance/firewall/l3FirewallRules",
+        "getNetworkApplianceFirewallL3FirewallRules",
+    ),
+    (
+        r"/networks/(?P<network>[^/]+)/appliance/security/intrusion",
+        "getNetworkApplianceSecurityIntrusion",
+    ),
+    (
+        r"/networks/(?P<network>[^/]+)/appliance/security/malware",
+        "getNetworkApplianceSecurityMalware",
+    ),
+    (
+        r"/networks/(?P<network>[^/]+)/appliance/contentFiltering",
+        "getNetworkApplianceContentFiltering",
+    ),
+]
+routes = [(re.compile(pattern + "$"), operation) for pattern, operation in routes]
+
+
+class NotFound(Exception):
+    pass
+
+
+class MockDashboard:
+    """Answers the Dashboard API endpoints used by org_overview from a SyntheticOrg."""
+
+    def __init__(
+        self, org, latency=0.0, jitter=0.0, throttle_rate=0.0, retry_after=1, seed=0
+    ):
+        self.org = org
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.throttled = 0
+            self.bytes = 0
+            # operation -> calls
+            self.operations = {}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "bytes": self.bytes,
+                "operations": dict(self.operations),
+            }
+
+    def handle(self, path, query):
+        """Return (status, headers, body) of a GET request."""
+        path = path[len(API_PREFIX) :] if path.startswith(API_PREFIX) else path
+        for pattern, operation in routes:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return 404, {}, {"errors": ["Not found"]}
+
+        delay = self.latency + (
+            self._random.random() * self.jitter if self.jitter else 0
+        )
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.calls += 1
+            self.operations[operation] = self.operations.get(operation, 0) + 1
+            throttle = self.throttle_rate and self._random.random() < self.throttle_rate
+            if throttle:
+                self.throttled += 1
+        if throttle:
+            return (
+                429,
+                {"Retry-After": str(self.retry_after)},
+                {"errors": ["Too many requests"]},
+            )
+
+        request = Request(path, query)
+        try:
+            body, links = getattr(self, operation)(request, **match.groupdict())
+        except NotFound:
+            return 404, {}, {"errors": ["Not found"]}
+        headers = {}
+        if links:
+            headers["Link"] = ", ".join(
+                f"<{url}>; rel={rel}" for rel, url in links.items()
+            )
+        return 200, headers, body
+
+    def count_bytes(self, size):
+        with self._lock:
+            self.bytes += size
+
+    # Organization endpoints, every organization serves the same objects
+
+    def getOrganizations(self, request):
+        return [
+            {"id": organization_id, "name": f"Organization {organization_id}"}
+            for organization_id in self.org.organization_ids()
+        ], None
+
+    def getOrganizationNetworks(self, request, org):
+        return request.page(range(self.org.networks), self.org.network, 1000, 100000)
+
+    def getOrganizationDevices(self, request, org):
+        return request.page(range(self.org.devices), self.org.device, 1000, 1000)
+
+    def getOrganizationDevicesAvailabilities(self, request, org):
+        return request.page(range(self.org.devices), self.org.availability, 1000, 1000)
+
+    def getOrganizationApplianceUplinkStatuses(self, request, org):
+        return request.page(
+            self.org.appliance_devices(), self.org.uplink_status, 1000, 1000
+        )
+
+    def getOrganizationAdmins(self, request, org):
+        return [self.org.admin(index) for index in range(self.org.admins)], None
+
+    def getOrganizationApiRequests(self, request, org):
+        t1 = request.time("t1", self.org.anchor)
+        t0 = request.time("t0", t1 - 31 * 86400)
+        return request.page(
+            self.org.api_request_range(t0, t1), self.org.api_request, 50, 1000
+        )
+
+    def getOrganizationApiRequestsOverview(self, request, org):
+        t1 = request.time("t1", self.org.anchor)
+        t0 = request.time("t0", t1 - 31 * 86400)
+        return self.org.api_requests_overview(t0, t1), None
+
+    def getOrganizationAssuranceAlerts(self, request, org):
+        indexes = self.org.alert_indexes(request.time("tsStart"), request.time("tsEnd"))
+        return request.page(indexes, self.org.alert, 30, 300)
+
+    def getOrganizationDevicesAvailabilitiesChangeHistory(self, request, org):
+        t1 = request.time("t1", self.org.anchor)
+        t0 = request.time("t0", t1 - 86400)
+        serials = request.list("serials") or [
+            self.org.serial(index) for index in range(self.org.devices)
+        ]
+        return request.page(
+            self.org.status_changes(serials, t0, t1), lambda change: change, 1000, 1000
+        )
+
+    def getOrganizationConfigurationChanges(self, request, org):
+        t1 = request.time("t1", self.org.anchor)
+        t0 = request.time("t0", t1 - 365 * 86400)
+        changes = self.org.configuration_changes(request.get("networkId"), t0, t1)
+        return request.page(changes, lambda change: change, 5000, 100000)
+
+    def getOrganizationIntegrationsXdrNetworks(self, request, org):
+        return self.org.xdr_networks(), None
+
+    # Network endpoints
+
+    def network_index(self, network):
+        try:
+            index = self.org.network_index(network)
+        except (IndexError, ValueError):
+            raise NotFound(network)
+        if not 0 <= index < self.org.networks:
+            raise NotFound(network)
+        return index
+
+    def getNetworkEvents(self, request, network):
+        index = self.network_index(network)
+        product_type = (
+            request.get("productType") or self.org.network(index)["productTypes"][0]
+        )
+        per_page = min(int(request.get("perPage", 10)), 1000)
+        starting_after = request.get("startingAfter")
+        ending_before = request.get("endingBefore")
+        events = self.org.event_page(
+            index,
+            product_type,
+            per_page=per_page,
+            starting_after=parse_iso(starting_after) if starting_after else None,
+            ending_before=parse_iso(ending_before) if ending_before else None,
+            included=set(request.list("includedEventTypes")),
+            excluded=set(request.list("excludedEventTypes")),
+            device_serial=request.get("deviceSerial"),
+        )
+        page_start = events[-1]["occurredAt"] if events else ending_before
+        page_end = events[0]["occurredAt"] if events else starting_after
+        links = {}
+        if len(events) >= per_page:
+            links["prev"] = request.link(endingBefore=page_start)
+            links["next"] = request.link(startingAfter=page_end, endingBefore=None)
+        body = {
+            "message": None,
+            "pageStartAt": page_start,
+            "pageEndAt": page_end,
+            "events": events,
+        }
+        return body, links
+
+    def getNetworkEventsEventTypes(self, request, network):
+        return self.org.network_event_types(self.network_index(network)), None
+
+    def getNetworkApplianceFirewallL3FirewallRules(self, request, network):
+        return self.org.firewall_rules(self.network_index(network)), None
+
+    def getNetworkApplianceSecurityIntrusion(self, request, network):
+        return self.org.intrusion(self.network_index(network)), None
+
+    def getNetworkApplianceSecurityMalware(self, request, network):
+        return self.org.malware(self.network_index(network)), None
+
+    def getNetworkApplianceContentFiltering(self, request, network):
+        return self.org.content_filtering(self.network_index(network)), None
+
+
+class Request:
+    """Query parameters of a request and the pagination links built from them."""
+
+    def __init__(self, path, query):
+        self.path = path
+        self.params = parse_qs(query, keep_blank_values=True)
+
+    def get(self, name, default=None):
+        values = self.params.get(name)
+        return values[0] if values else default
+
+    def list(self, name):
+        """Array parameter, sent as name[]=a&name[]=b by the SDK."""
+        return self.params.get(f"{name}[]", []) + self.params.get(name, [])
+
+    def time(self, name, default=None):
+        return parse_time(self.get(name), default)
+
+    def link(self, **changes):
+        # Relative to the base URL: the SDK prefixes its base URL to links
+        # whose host is not a Meraki domain
+        params = dict(self.params)
+        for name, value in changes.items():
+            if value is None:
+                params.pop(name, None)
+            else:
+                params[name] = [value]
+        return f"{self.path}?{urlencode(params, doseq=True)}"
+
+    def page(self, indexes, build, default_per_page, max_per_page):
+        """Build one page of a list endpoint, startingAfter is an offset."""
+        per_page = min(int(self.get("perPage", default_per_page)), max_per_page)
+        offset = int(self.get("startingAfter", 0))
+        if isinstance(indexes, range):
+            chunk = list(indexes[offset : offset + per_page + 1])
+        else:
+            chunk = list(islice(indexes, offset, offset + per_page + 1))
+        links = {}
+        if len(chunk) > per_page:
+            links["next"] = self.link(startingAfter=str(offset + per_page))
+        return [build(index) for index in chunk[:per_page]], links
+
+
+def make_handler(dashboard):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, the SDK pools its connections
+        protocol_version = "HTTP/1.1"
+        # Headers and body in one segment, no delayed ACK stalls
+        wbufsize = 1 << 16
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/_bench/stats":
+                return self.send_json(200, {}, dashboard.stats())
+            status, headers, body = dashboard.handle(url.path, url.query)
+            size = self.send_json(status, headers, body)
+            dashboard.count_bytes(size)
+
+        def do_POST(self):
+            if urlsplit(self.path).path == "/_bench/reset":
+                dashboard.reset()
+                return self.send_json(200, {}, {})
+            self.send_json(404, {}, {"errors": ["Not found"]})
+
+        def send_json(self, status, headers, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+            return len(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8080, org_kwargs=None, **options):
+    """Serve a synthetic organization until interrupted."""
+    dashboard = MockDashboard(SyntheticOrg(**(org_kwargs or {})), **options)
+    server = ThreadingHTTPServer((host, port), make_handler(dashboard))
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def add_org_arguments(parser):
+    """Synthetic organization and fault injection options, shared with run.py"""
+    parser.add_argument("--preset", choices=sorted(presets), default="small")
+    parser.add_argument("--organization-id", default="1")
+    parser.add_argument(
+        "--organizations", type=int, default=1, help="organizations listed"
+    )
+    for name in presets["small"]:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name)
+    parser.add_argument(
+        "--latency-ms", type=float, default=0, help="added to every response"
+    )
+    parser.add_argument(
+        "--jitter-ms", type=float, default=0, help="random extra latency, up to"
+    )
+    parser.add_argument(
+        "--rate-429", type=float, default=0, help="share of requests answered 429"
+    )
+    parser.add_argument(
+        "--retry-after", type=int, default=1, help="Retry-After of the 429 answers"
+    )
+
+
+def org_arguments(args):
+    """SyntheticOrg and MockDashboard keyword arguments of parsed options."""
+    org_kwargs = dict(
+        presets[args.preset],
+        organization_id=args.organization_id,
+        organizations=args.organizations,
+    )
+    for name in presets["small"]:
+        if getattr(args, name) is not None:
+            org_kwargs[name] = getattr(args, name)
+    options = {
+        "latency": args.latency_ms / 1000,
+        "jitter": args.jitter_ms / 1000,
+        "throttle_rate": args.rate_429,
+        "retry_after": args.retry_after,
+    }
+    return org_kwargs, options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in of the Dashboard API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_org_arguments(parser)
+    args = parser.parse_args()
+    org_kwargs, options = org_arguments(args)
+    print(f"Serving {org_kwargs} on http://{args.host}:{args.port}{API_PREFIX}")
+    serve(args.host, args.port, org_kwargs, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Benchmark the org_overview fetch paths against the local Dashboard API stand-in.
+
+    python bench/run.py --preset large --latency-ms 50 --rate-429 0.01
+
+Every benchmark starts from empty caches; the on-disk stores (event log,
+boot history, API usage rollups) live in a temporary data directory that
+is kept between repeats, so --repeat 2 shows the incremental runs.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from mock_api import add_org_arguments, org_arguments, serve, API_PREFIX
+
+ORG_OVERVIEW_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "org_overview"
+)
+
+
+def bench_mx_sec_status(organization_id, args):
+    from config import dashboard
+    from mx_sec_status import fetch_mx_sec_status
+
+    return fetch_mx_sec_status(dashboard, organization_id)
+
+
+def bench_mx_sec_status_async(organization_id, args):
+    from config import aio_dashboard
+    from mx_sec_status import fetch_mx_sec_status_async
+
+    return run_async(fetch_mx_sec_status_async(aio_dashboard, organization_id))
+
+
+def bench_firmware_status(organization_id, args):
+    from config import dashboard
+    from firmware_status import fetch_firmware_status
+
+    return fetch_firmware_status(dashboard, organization_id)
+
+
+def bench_log_overview(organization_id, args):
+    from config import dashboard, logs_events_selected
+    from logs_overview import fetch_log_overview
+
+    return fetch_log_overview(
+        dashboard, organization_id, "appliance", logs_events_selected["appliance"]
+    )
+
+
+def bench_api_statistics(organization_id, args):
+    from config import dashboard_iterator
+    from api_usage import fetch_api_statistics
+
+    now = datetime.now(timezone.utc)
+    date_range = {
+        "t0": int((now - timedelta(days=args.api_days)).timestamp()),
+        "t1": int(now.timestamp()),
+    }
+    return fetch_api_statistics(dashboard_iterator, organization_id, date_range)
+
+
+def bench_alert_correlation(organization_id, args):
+    from config import dashboard
+    import event_correlation
+
+    return event_correlation.fetch_function(dashboard, organization_id)
+
+
+def bench_ms_reboot_reason(organization_id, args):
+    from config import dashboard
+    import ms_reboot_reason
+
+    return ms_reboot_reason.fetch_function(dashboard, organization_id)
+
+
+benchmarks = {
+    "mx_sec_status": bench_mx_sec_status,
+    "mx_sec_status_async": bench_mx_sec_status_async,
+    "firmware_status": bench_firmware_status,
+    "log_overview": bench_log_overview,
+    "api_statistics": bench_api_statistics,
+    "alert_correlation": bench_alert_correlation,
+    "ms_reboot_reason": bench_ms_reboot_reason,
+}
+
+
+# Event loop of the meraki.aio benchmarks, aio_dashboard is bound to one loop
+_loop = None
+
+
+def run_async(coro):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_request(port, path, method="GET"):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", method=method)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def start_server(port, org_kwargs, options):
+    """Run the stand-in in its own process, out of the measured memory."""
+    process = multiprocessing.Process(
+        target=serve,
+        args=("127.0.0.1", port, org_kwargs),
+        kwargs=options,
+        daemon=True,
+    )
+    process.start()
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            server_request(port, "/_bench/stats")
+            return process
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                raise RuntimeError("mock Dashboard API did not start")
+            time.sleep(0.1)
+
+
+def disable_sdk_rate_limit():
+    """Leave the pace to --rate-limit, newer SDKs also throttle every organization."""
+    from config import dashboard, dashboard_iterator, aio_dashboard
+
+    for api in (dashboard, dashboard_iterator, aio_dashboard):
+        if getattr(api._session, "_smart_flow", None) is not None:
+            api._session._smart_flow = None
+
+
+def count_rows(result):
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(len(value) for value in result.values() if isinstance(value, list))
+    return None
+
+
+def run_benchmark(name, organization_id, args, port):
+    """Run one benchmark from cold caches, return its measurements."""
+    from cache import invalidate
+
+    invalidate()
+    server_request(port, "/_bench/reset", "POST")
+    tracemalloc.start()
+    start = time.perf_counter()
+    error = None
+    rows = None
+    try:
+        rows = count_rows(benchmarks[name](organization_id, args))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = server_request(port, "/_bench/stats")
+    return {
+        "benchmark": name,
+        "wall_s": round(wall, 3),
+        "api_calls": stats["calls"],
+        "throttled": stats["throttled"],
+        "response_mb": round(stats["bytes"] / 2**20, 2),
+        "peak_mb": round(peak / 2**20, 2),
+        "rows": rows,
+        "error": error,
+        "operations": stats["operations"],
+    }
+
+
+def print_results(results):
+    columns = [
+        "benchmark",
+        "wall_s",
+        "api_calls",
+        "throttled",
+        "response_mb",
+        "peak_mb",
+        "rows",
+    ]
+    widths = [max(len(c), *(len(str(r[c])) for r in results)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result[c]).ljust(w) for c, w in zip(columns, widths)))
+        if result["error"]:
+            print(f"  error: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_org_arguments(parser)
+    parser.add_argument(
+        "benchmarks", nargs="*", help=f"default: all of {', '.join(benchmarks)}"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=1000,
+        help="client side requests per second, the Dashboard allows 10",
+    )
+    parser.add_argument("--api-days", type=int, default=30)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(benchmarks)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    org_kwargs, options = org_arguments(args)
+    port = free_port()
+    server = start_server(port, org_kwargs, options)
+
+    # config reads these when first imported
+    os.environ.update(
+        {
+            "MK_CSM_KEY": "bench",
+            "MK_CSM_ORG": args.organization_id,
+            "MK_BASE_URL": f"http://127.0.0.1:{port}{API_PREFIX}",
+            "MK_RATE_LIMIT": str(args.rate_limit),
+            "MK_DATA_DIR": tempfile.mkdtemp(prefix="org_overview_bench_"),
+        }
+    )
+    sys.path.insert(0, ORG_OVERVIEW_DIR)
+    from utils import set_headless
+
+    set_headless()
+    disable_sdk_rate_limit()
+
+    print(f"Synthetic organization: {org_kwargs}", file=sys.stderr)
+    results = []
+    try:
+        for run in range(args.repeat):
+            for name in args.benchmarks or list(benchmarks):
+                result = run_benchmark(name, args.organization_id, args, port)
+                result["run"] = run + 1
+                results.append(result)
+                print(f"{name} run {run + 1}: {result['wall_s']}s", file=sys.stderr)
+    finally:
+        server.terminate()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
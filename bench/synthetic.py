@@ -0,0 +1,522 @@
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import islice
+
+# Sizes of the synthetic organizations, see SyntheticOrg
+presets = {
+    "small": {
+        "networks": 200,
+        "devices": 2000,
+        "api_requests": 20000,
+        "events_per_network": 200,
+        "alerts": 50,
+    },
+    "medium": {
+        "networks": 2000,
+        "devices": 20000,
+        "api_requests": 200000,
+        "events_per_network": 500,
+        "alerts": 200,
+    },
+    "large": {
+        "networks": 10000,
+        "devices": 100000,
+        "api_requests": 1000000,
+        "events_per_network": 1000,
+        "alerts": 500,
+    },
+}
+
+# Product types of a network, by network index modulo 4
+network_product_types = [
+    ["appliance", "switch", "wireless"],
+    ["appliance"],
+    ["switch"],
+    ["switch", "wireless"],
+]
+models = {"appliance": "MX68", "switch": "MS120-8", "wireless": "MR46"}
+device_types = {"appliance": "MX", "switch": "MS", "wireless": "MR"}
+
+# Event types of the event log, by product type
+event_types = {
+    "appliance": [
+        ("VPN", "vpn_connectivity_change", "VPN connectivity changed"),
+        ("Security", "cf_block", "Content filtering blocked URL"),
+        ("DHCP", "dhcp_problem", "DHCP problem"),
+        ("Routing", "failover_event", "Failover event"),
+        ("Security", "sf_url_block", "URL blocked"),
+        ("Client", "dhcp_lease", "DHCP lease"),
+    ],
+    "switch": [
+        ("Device", "boot", "Device booted"),
+        ("Ports", "port_status", "Port status change"),
+        ("STP", "stp_port_role_change", "Port STP role change"),
+        ("Ports", "port_cycle", "Port cycled"),
+        ("Client", "8021x_auth", "802.1X authentication"),
+        ("DHCP", "dhcp_lease", "DHCP lease"),
+        ("Ports", "port_status", "Port status change"),
+        ("Ports", "port_status", "Port status change"),
+    ],
+    "wireless": [
+        ("Association", "association", "802.11 association"),
+        ("Association", "disassociation", "802.11 disassociation"),
+        ("Auth", "wpa_auth", "WPA authentication"),
+        ("Auth", "wpa_deauth", "WPA deauthentication"),
+    ],
+}
+boot_reasons = ["power loss", "firmware upgrade", "watchdog", "user request"]
+api_methods = ["GET"] * 7 + ["PUT", "PUT", "POST"]
+api_paths = [
+    "/organizations/{org}/networks",
+    "/organizations/{org}/devices",
+    "/organizations/{org}/devices/availabilities",
+    "/networks/{network}/events",
+    "/networks/{network}/appliance/firewall/l3FirewallRules",
+]
+
+
+def iso(ts):
+    """ISO timestamp of a unix time, in the Dashboard API format."""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def parse_iso(value):
+    """Unix time of an ISO timestamp, with or without fraction and Z."""
+    value = value.rstrip("Z")
+    if "." in value:
+        value = value.split(".")[0]
+    return (
+        datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+        .replace(tzinfo=timezone.utc)
+        .timestamp()
+    )
+
+
+def parse_time(value, default=None):
+    """Unix time of a t0/t1 style parameter: epoch seconds or ISO."""
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return parse_iso(value)
+
+
+class SyntheticOrg:
+    """A Dashboard organization whose objects are computed from their index.
+
+    Nothing is stored per network or device, every list endpoint builds
+    only the page requested, so a 100k device organization costs no more
+    memory than a small one.
+    """
+
+    def __init__(
+        self,
+        organization_id="1",
+        organizations=1,
+        networks=200,
+        devices=2000,
+        api_requests=20000,
+        events_per_network=200,
+        alerts=50,
+        admins=20,
+        api_days=30,
+        event_days=7,
+        alert_days=20,
+    ):
+        self.organization_id = organization_id
+        self.organizations = organizations
+        self.networks = networks
+        self.devices = devices
+        self.api_requests = api_requests
+        self.events_per_network = events_per_network
+        self.alerts = alerts
+        self.admins = admins
+        # Everything is generated backwards from the server start
+        self.anchor = int(time.time())
+        self.api_start = self.anchor - api_days * 86400
+        self.api_step = api_days * 86400 / max(api_requests, 1)
+        self.event_step = max(1, event_days * 86400 // max(events_per_network, 1))
+        self.alert_step = max(60, alert_days * 86400 // max(alerts, 1))
+
+    def organization_ids(self):
+        """IDs listed by getOrganizations, organization_id and the next ones."""
+        first = int(self.organization_id)
+        return [str(first + i) for i in range(self.organizations)]
+
+    # Networks and devices
+
+    def network(self, index):
+        return {
+            "id": f"N_{index}",
+            "organizationId": self.organization_id,
+            "name": f"Network {index}",
+            "productTypes": network_product_types[index % 4],
+            "timeZone": "Europe/Amsterdam",
+            "tags": [f"region-{index % 5}"],
+        }
+
+    def network_index(self, network_id):
+        return int(network_id.split("_", 1)[1])
+
+    def device_product_type(self, index):
+        product_types = network_product_types[(index % self.networks) % 4]
+        return product_types[(index // self.networks) % len(product_types)]
+
+    def serial(self, index):
+        return f"Q2SY-{index // 10000:04d}-{index % 10000:04d}"
+
+    def device_index(self, serial):
+        _, high, low = serial.split("-")
+        return int(high) * 10000 + int(low)
+
+    def network_devices(self, network_index):
+        """Indexes of the devices of a network."""
+        return range(network_index, self.devices, self.networks)
+
+    def device(self, index):
+        product_type = self.device_product_type(index)
+        if index % 97 == 0:
+            firmware = "Firmware locked. Please contact support."
+        elif index % 17 == 0:
+            firmware = "Not running configured version"
+        else:
+            firmware = f"{product_type}-18-2"
+        return {
+            "name": f"{device_types[product_type]} {index}",
+            "serial": self.serial(index),
+            "mac": f"00:18:0a:{index >> 16 & 255:02x}:{index >> 8 & 255:02x}:{index & 255:02x}",
+            "model": models[product_type],
+            "networkId": f"N_{index % self.networks}",
+            "productType": product_type,
+            "firmware": firmware,
+            "lanIp": f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",
+            "tags": [],
+        }
+
+    def availability(self, index):
+        device = self.device(index)
+        return {
+            "serial": device["serial"],
+            "name": device["name"],
+            "mac": device["mac"],
+            "productType": device["productType"],
+            "network": {"id": device["networkId"]},
+            "status": "offline" if index % 13 == 0 else "online",
+            "tags": [],
+        }
+
+    def appliance_devices(self):
+        for index in range(self.devices):
+            if self.device_product_type(index) == "appliance":
+                yield index
+
+    def uplink_status(self, index):
+        device = self.device(index)
+        role = "spare" if index % 50 == 1 else "primary"
+        return {
+            "networkId": device["networkId"],
+            "serial": device["serial"],
+            "model": device["model"],
+            "lastReportedAt": iso(self.anchor - index % 300),
+            "highAvailability": {"enabled": role == "spare", "role": role},
+            "uplinks": [
+                {
+                    "interface": "wan1",
+                    "status": "failed" if index % 29 == 0 else "active",
+                    "ip": f"192.0.2.{index % 250}",
+                },
+                {
+                    "interface": "wan2",
+                    "status": "ready",
+                    "ip": f"198.51.100.{index % 250}",
+                },
+            ],
+        }
+
+    def admin(self, index):
+        return {
+            "id": f"A_{index}",
+            "name": f"Admin {index}",
+            "email": f"admin{index}@example.com",
+            "orgAccess": "full" if index % 4 == 0 else "read-only",
+            "accountStatus": "ok",
+            "twoFactorAuthEnabled": index % 2 == 0,
+            "lastActive": iso(self.anchor - index * 3600),
+        }
+
+    # API requests log
+
+    def api_request_range(self, t0, t1):
+        """Indexes of the API requests with t0 <= ts <= t1."""
+        first = max(0, int(-(-(t0 - self.api_start) // self.api_step)))
+        last = min(self.api_requests, int((t1 - self.api_start) // self.api_step) + 1)
+        return range(first, max(first, last))
+
+    def api_request_code(self, index):
+        if index % 97 == 0:
+            return 404
+        if index % 50 == 0:
+            return 429
+        return 200
+
+    def api_request(self, index):
+        path = api_paths[index % len(api_paths)].format(
+            org=self.organization_id, network=f"N_{index % self.networks}"
+        )
+        return {
+            "adminId": f"A_{index % self.admins}",
+            "method": api_methods[index % len(api_methods)],
+            "host": "api.meraki.com",
+            "path": "/api/v1" + path,
+            "queryString": "",
+            "userAgent": "python-meraki/bench",
+            "ts": iso(self.api_start + index * self.api_step),
+            "responseCode": self.api_request_code(index),
+            "sourceIp": f"203.0.113.{index % 250}",
+            "version": 1,
+        }
+
+    def api_requests_overview(self, t0, t1):
+        codes = Counter(
+            self.api_request_code(i) for i in self.api_request_range(t0, t1)
+        )
+        return {"responseCodeCounts": {str(code): n for code, n in codes.items()}}
+
+    # Event log, newest event first: event k happened at anchor - k * event_step
+
+    def event_time(self, k):
+        return self.anchor - k * self.event_step
+
+    def event(self, network_index, product_type, k):
+        category, typ, description = event_types[product_type][
+            k % len(event_types[product_type])
+        ]
+        devices = [
+            i
+            for i in islice(self.network_devices(network_index), 8)
+            if self.device_product_type(i) == product_type
+        ] or [network_index]
+        device = devices[k % len(devices)]
+        event = {
+            "occurredAt": iso(self.event_time(k)),
+            "networkId": f"N_{network_index}",
+            "type": typ,
+            "description": description,
+            "category": category,
+            "clientId": f"k{k % 500}",
+            "clientDescription": f"client-{k % 500}",
+            "clientMac": f"aa:bb:cc:00:{k >> 8 & 255:02x}:{k & 255:02x}",
+            "deviceSerial": self.serial(device),
+            "deviceName": f"{device_types[product_type]} {device}",
+            "eventData": {},
+        }
+        if typ == "boot":
+            event["eventData"] = {"reason": boot_reasons[k % len(boot_reasons)]}
+        return event
+
+    def event_page(
+        self,
+        network_index,
+        product_type,
+        per_page=10,
+        starting_after=None,
+        ending_before=None,
+        included=None,
+        excluded=None,
+        device_serial=None,
+    ):
+        """Events of a page, newest first, as the event log endpoint returns them."""
+        if product_type not in network_product_types[network_index % 4]:
+            return []
+        newest = 0
+        oldest = self.events_per_network - 1
+        if ending_before is not None:
+            # Strictly before: the smallest k with event_time(k) < ending_before
+            newest = max(
+                newest, int((self.anchor - ending_before) // self.event_step) + 1
+            )
+        if starting_after is not None:
+            oldest = min(
+                oldest, int(-(-(self.anchor - starting_after) // self.event_step)) - 1
+            )
+        if newest > oldest:
+            return []
+
+        # Pages go back in time unless only startingAfter is given
+        if ending_before is None and starting_after is not None:
+            ks = range(oldest, newest - 1, -1)
+        else:
+            ks = range(newest, oldest + 1)
+        events = []
+        for k in ks:
+            event = self.event(network_index, product_type, k)
+            if included and event["type"] not in included:
+                continue
+            if excluded and event["type"] in excluded:
+                continue
+            if device_serial and event["deviceSerial"] != device_serial:
+                continue
+            events.append(event)
+            if len(events) >= per_page:
+                break
+        events.sort(key=lambda event: event["occurredAt"], reverse=True)
+        return events
+
+    def network_event_types(self, network_index):
+        return [
+            {"category": category, "type": typ, "description": description}
+            for product_type in network_product_types[network_index % 4]
+            for category, typ, description in dict.fromkeys(event_types[product_type])
+        ]
+
+    # Alerts, device status changes and configuration changes
+
+    def alert(self, index):
+        device = (index * 7919) % self.devices
+        product_type = self.device_product_type(device)
+        started = self.anchor - (index + 1) * self.alert_step
+        return {
+            "id": f"alert_{index}",
+            "categoryType": "connectivity",
+            "type": "Device went offline",
+            "severity": "critical",
+            "deviceType": device_types[product_type],
+            "startedAt": iso(started)[:19] + "Z",
+            "resolvedAt": iso(started + 1800)[:19] + "Z",
+            "network": {"id": f"N_{device % self.networks}", "name": ""},
+            "scope": {
+                "devices": [
+                    {
+                        "serial": self.serial(device),
+                        "name": f"{device_types[product_type]} {device}",
+                        "productType": product_type,
+                    }
+                ]
+            },
+        }
+
+    def alert_indexes(self, ts_start=None, ts_end=None):
+        for index in range(self.alerts):
+            started = self.anchor - (index + 1) * self.alert_step
+            if ts_start is not None and started < ts_start:
+                break
+            if ts_end is not None and started > ts_end:
+                continue
+            yield index
+
+    def status_changes(self, serials, t0, t1):
+        """Status changes of the devices, one every 6 hours per device."""
+        step = 6 * 3600
+        for serial in serials:
+            index = self.device_index(serial)
+            offset = index * 677 % step
+            # Change m happened at anchor - offset - m * step
+            first = max(0, int(-(-(self.anchor - offset - t1) // step)))
+            m = first
+            while self.anchor - offset - m * step >= t0:
+                ts = self.anchor - offset - m * step
+                offline = m % 2 == 0
+                device = self.device(index)
+                yield {
+                    "ts": iso(ts),
+                    "device": {
+                        "serial": serial,
+                        "name": device["name"],
+                        "model": device["model"],
+                        "productType": device["productType"],
+                    },
+                    "details": {
+                        "old": [
+                            {
+                                "name": "status",
+                                "value": "online" if offline else "offline",
+                            }
+                        ],
+                        "new": [
+                            {
+                                "name": "status",
+                                "value": "offline" if offline else "online",
+                            },
+                            {"name": "reason", "value": "heartbeat lost"},
+                        ],
+                    },
+                    "network": {"id": device["networkId"], "name": ""},
+                }
+                m += 1
+
+    def configuration_changes(self, network_id, t0, t1):
+        """Configuration changes of a network, one every 2 hours, newest first."""
+        step = 2 * 3600
+        network_index = self.network_index(network_id) if network_id else 0
+        offset = network_index * 331 % step
+        first = max(0, int(-(-(self.anchor - offset - t1) // step)))
+        m = first
+        while self.anchor - offset - m * step >= t0:
+            ts = self.anchor - offset - m * step
+            yield {
+                "ts": iso(ts),
+                "adminName": f"Admin {m % self.admins}",
+                "adminEmail": f"admin{m % self.admins}@example.com",
+                "adminId": f"A_{m % self.admins}",
+                "networkId": network_id,
+                "page": "Firewall",
+                "label": "L3 firewall rules",
+                "oldValue": "[]",
+                "newValue": f'[{{"policy": "deny", "comment": "rule {m}"}}]',
+            }
+            m += 1
+
+    # Appliance settings
+
+    def firewall_rules(self, network_index):
+        return {
+            "rules": [
+                {
+                    "comment": f"rule {i}",
+                    "policy": "allow" if i % 2 else "deny",
+                    "protocol": "tcp",
+                    "destPort": str(1000 + i),
+                    "destCidr": "Any",
+                    "srcPort": "Any",
+                    "srcCidr": "Any",
+                }
+                for i in range(network_index % 7)
+            ]
+            + [{"comment": "Default rule", "policy": "allow", "protocol": "Any"}]
+        }
+
+    def intrusion(self, network_index):
+        if network_index % 3 == 0:
+            return {"mode": "disabled"}
+        return {"mode": "prevention", "idsRulesets": "balanced"}
+
+    def malware(self, network_index):
+        return {"mode": "enabled" if network_index % 2 else "disabled"}
+
+    def content_filtering(self, network_index):
+        return {
+            "allowedUrlPatterns": [
+                f"allowed{i}.example.com" for i in range(network_index % 3)
+            ],
+            "blockedUrlPatterns": [
+                f"blocked{i}.example.com" for i in range(network_index % 4)
+            ],
+            "blockedUrlCategories": [
+                {"id": f"meraki:contentFiltering/category/{i}", "name": f"Category {i}"}
+                for i in range(network_index % 5)
+            ],
+            "urlCategoryListSize": "topSites",
+        }
+
+    def xdr_networks(self):
+        return [
+            {
+                "networkId": f"N_{index}",
+                "name": f"Network {index}",
+                "enabled": index % 2 == 0,
+            }
+            for index in range(min(self.networks, 100))
+            if "appliance" in network_product_types[index % 4]
+        ]
@@ -3,12 +3,13 @@ from pywebio import start_server
 from utils import *
 from navigation import navigate_to_main
 from config import *
+from cache import get_admins, get_dataset_async
 
 
 page_title = "Admins Overview"
 
 
-def admin_overview(main_func=None):
+async def admin_overview(main_func=None):
     """Render header"""
     if main_func:
         page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
@@ -16,22 +17,26 @@ def admin_overview(main_func=None):
         page_init(back_to_main_text, page_title)
 
     """Fetch data"""
-    data = fetch_admin_overview(dashboard, ORGANIZATION_ID)
+    with loading("Fetching data, please wait..."):
+        data = await run_aio(fetch_admin_overview_async(aio_dashboard, ORGANIZATION_ID))
     """Display data"""
     put_datatable(data)
 
 
 def fetch_admin_overview(dashboard, organization_id):
-    with put_loading():
-        put_text("Fetching data, please wait...")
-        admins = dashboard.organizations.getOrganizationAdmins(organization_id)
+    with loading("Fetching data, please wait..."):
+        admins = get_admins(dashboard, organization_id)
     return admins
 
 
+async def fetch_admin_overview_async(aio_dashboard, organization_id):
+    return await get_dataset_async("admins", aio_dashboard, organization_id)
+
+
 def main():
     """Main function for standalone execution"""
     # Start the server with the admin_overview function
-    start_server(lambda: admin_overview(), port=8999, debug=True)
+    start_server(admin_overview, port=8999, debug=True)
 
 
 if __name__ == "__main__":
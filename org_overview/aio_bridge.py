@@ -0,0 +1,33 @@
+import asyncio
+
+
+class ThreadedAPI:
+    """Awaitable view of a DashboardAPI, or of one of its sections.
+
+    await ThreadedAPI(dashboard).organizations.getOrganizationNetworks(...)
+    runs the blocking call in a worker thread, so a fetch written against
+    meraki.aio also runs on the sync DashboardAPI.
+    """
+
+    def __init__(self, api):
+        self._api = api
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if not callable(attr):
+            return ThreadedAPI(attr)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+
+        return call
+
+
+def run_sync(coro_func, dashboard, *args):
+    """Run coro_func(aio_dashboard, *args) to completion with a sync dashboard.
+
+    The blocking variant of a fetch written once for meraki.aio: it runs on
+    a new event loop in the calling thread (a worker thread, the export CLI,
+    ...), the API calls in threads of that loop.
+    """
+    return asyncio.run(coro_func(ThreadedAPI(dashboard), *args))
@@ -0,0 +1,144 @@
+from array import array
+from collections import Counter
+from api_rollup import ApiUsageAggregator, DayRollup
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the python aggregator is used instead
+    np = None
+
+SECONDS_PER_DAY = 86400
+# Timestamps are parsed by numpy in chunks of this many rows
+TS_CHUNK_SIZE = 65536
+
+
+def columns_available():
+    return np is not None
+
+
+class Categories:
+    """Maps repeated strings (methods, admin IDs, paths) to integer codes."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+        self.column = array("i")
+
+    def append(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        self.column.append(code)
+
+
+class ApiRequestColumns:
+    """API request log stored column by column as NumPy arrays.
+
+    Timestamps are kept as epoch seconds, response codes as small integers and
+    the string fields as categorical codes, which takes a fraction of the
+    memory of the list of dicts returned by getOrganizationApiRequests. The
+    group-bys are vectorized with np.unique over the stacked key columns.
+    """
+
+    categorical_fields = ("method", "adminId", "path")
+
+    def __init__(self):
+        self._ts = array("q")
+        self._ts_chunk = []
+        self._response_codes = array("h")
+        self._categories = {field: Categories() for field in self.categorical_fields}
+
+    def append(self, entry):
+        self._ts_chunk.append(entry["ts"][:19])
+        if len(self._ts_chunk) >= TS_CHUNK_SIZE:
+            self._flush_ts()
+        self._response_codes.append(entry["responseCode"])
+        for field, categories in self._categories.items():
+            categories.append(entry.get(field))
+
+    def extend(self, entries):
+        """Append entries from a list or from a generator consumed page by page."""
+        for entry in entries:
+            self.append(entry)
+        self._flush_ts()
+        return self
+
+    def _flush_ts(self):
+        if self._ts_chunk:
+            seconds = np.array(self._ts_chunk, dtype="datetime64[s]").astype("int64")
+            self._ts.extend(seconds.tolist())
+            self._ts_chunk = []
+
+    def __len__(self):
+        return len(self._response_codes)
+
+    @property
+    def ts(self):
+        self._flush_ts()
+        return np.frombuffer(self._ts, dtype=np.int64)
+
+    @property
+    def response_codes(self):
+        return np.frombuffer(self._response_codes, dtype=np.int16)
+
+    def codes(self, field):
+        return np.frombuffer(self._categories[field].column, dtype=np.int32)
+
+    def values(self, field):
+        return self._categories[field].values
+
+    def _keys(self, field):
+        """Return (integer keys, decoder) of a column usable in a group-by."""
+        if field == "day":
+            days = self.ts // SECONDS_PER_DAY
+            return days, lambda day: str(np.datetime64(int(day), "D"))
+        if field == "hour":
+            return (self.ts % SECONDS_PER_DAY) // 3600, int
+        if field == "responseCode":
+            return self.response_codes, int
+        values = self.values(field)
+        return self.codes(field), lambda code: values[code]
+
+    def count_by(self, *fields):
+        """Count rows by one or more columns ("day", "responseCode", "method", ...).
+
+        Returns a dict mapping tuples of decoded values to counts.
+        """
+        if not len(self):
+            return {}
+        keys, decoders = zip(*(self._keys(field) for field in fields))
+        groups, counts = np.unique(np.stack(keys), axis=1, return_counts=True)
+        return {
+            tuple(decode(key) for decode, key in zip(decoders, group)): int(count)
+            for group, count in zip(groups.T, counts)
+        }
+
+    def to_aggregator(self):
+        """Build the per-day aggregates used by the API Usage charts."""
+        aggregator = ApiUsageAggregator()
+
+        def rollup(day):
+            if day not in aggregator.days:
+                aggregator.days[day] = DayRollup()
+            return aggregator.days[day]
+
+        for (day, code), count in self.count_by("day", "responseCode").items():
+            rollup(day).codes[code] = count
+        for (day, method), count in self.count_by("day", "method").items():
+            rollup(day).methods[method] = count
+        for (day, admin_id, code), count in self.count_by(
+            "day", "adminId", "responseCode"
+        ).items():
+            rollup(day).admins.setdefault(admin_id, Counter())[code] = count
+        for (day, path), count in self.count_by("day", "path").items():
+            rollup(day).paths[path] = count
+        for (day, hour, code), count in self.count_by(
+            "day", "hour", "responseCode"
+        ).items():
+            rollup(day).hour_codes[(hour, code)] = count
+        for (day, hour, method), count in self.count_by(
+            "day", "hour", "method"
+        ).items():
+            rollup(day).hour_methods[(hour, method)] = count
+        return aggregator
@@ -0,0 +1,59 @@
+import inspect
+
+
+def wrap_session_request(dashboard, wrapper):
+    """Route every Dashboard API request of a DashboardAPI instance through wrapper.
+
+    The meraki SDK sends each page of each call through its session's
+    request(metadata, method, url, **kwargs) method; wrapper is called as
+    wrapper(send, metadata, method, url, **kwargs) and must call send itself.
+    """
+    session = dashboard._session
+    send = session.request
+
+    def request(metadata, method, url, **kwargs):
+        return wrapper(send, metadata, method, url, **kwargs)
+
+    session.request = request
+
+
+def wrap_async_session_request(aio_dashboard, wrapper):
+    """Same as wrap_session_request, for a meraki.aio AsyncDashboardAPI.
+
+    wrapper is a coroutine function and must await send itself.
+    """
+    session = aio_dashboard._session
+    send = session.request
+
+    async def request(metadata, method, url, **kwargs):
+        return await wrapper(send, metadata, method, url, **kwargs)
+
+    session.request = request
+
+
+def add_response_hook(dashboard, hook):
+    """Call hook(response) for every HTTP response of a DashboardAPI instance.
+
+    Unlike session.request, this sees every attempt, retries included. Older
+    SDKs send through a requests.Session, newer ones through an httpx.Client
+    (an httpx.AsyncClient for meraki.aio).
+    """
+    session = dashboard._session
+    requests_session = getattr(session, "_req_session", None)
+    if requests_session is not None and hasattr(requests_session, "hooks"):
+        requests_session.hooks["response"].append(
+            lambda response, *args, **kwargs: hook(response)
+        )
+        return True
+    client = getattr(session, "_client", None)
+    if client is not None and hasattr(client, "event_hooks"):
+        if inspect.iscoroutinefunction(session.request):
+            # httpx.AsyncClient awaits its hooks
+            async def async_hook(response):
+                hook(response)
+
+            client.event_hooks["response"].append(async_hook)
+        else:
+            client.event_hooks["response"].append(hook)
+        return True
+    return False
@@ -0,0 +1,187 @@
+import json
+import os
+from collections import Counter
+from datetime import date, timedelta
+from config import api_rollup_dir, chart_hourly_max_days, chart_daily_max_days
+
+ROLLUP_VERSION = 2
+
+
+class DayRollup:
+    """API request counts of a single day."""
+
+    __slots__ = ("codes", "methods", "admins", "paths", "hour_codes", "hour_methods")
+
+    def __init__(self):
+        self.codes = Counter()
+        self.methods = Counter()
+        # adminId -> Counter of response codes
+        self.admins = {}
+        self.paths = Counter()
+        # (hour, code) and (hour, method) counts for the hourly charts
+        self.hour_codes = Counter()
+        self.hour_methods = Counter()
+
+    def merge(self, other):
+        """Add the counts of another rollup of the same day."""
+        self.codes.update(other.codes)
+        self.methods.update(other.methods)
+        for admin_id, codes in other.admins.items():
+            self.admins.setdefault(admin_id, Counter()).update(codes)
+        self.paths.update(other.paths)
+        self.hour_codes.update(other.hour_codes)
+        self.hour_methods.update(other.hour_methods)
+        return self
+
+    def to_dict(self):
+        return {
+            "version": ROLLUP_VERSION,
+            "codes": self.codes,
+            "methods": self.methods,
+            "admins": self.admins,
+            "paths": self.paths,
+            "hour_codes": {
+                f"{h}|{code}": n for (h, code), n in self.hour_codes.items()
+            },
+            "hour_methods": {
+                f"{h}|{method}": n for (h, method), n in self.hour_methods.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        rollup = cls()
+        # JSON object keys are strings, response codes are integers
+        rollup.codes = Counter({int(code): n for code, n in data["codes"].items()})
+        rollup.methods = Counter(data["methods"])
+        rollup.admins = {
+            admin_id: Counter({int(code): n for code, n in codes.items()})
+            for admin_id, codes in data["admins"].items()
+        }
+        rollup.paths = Counter(data["paths"])
+        for key, n in data["hour_codes"].items():
+            hour, code = key.split("|", 1)
+            rollup.hour_codes[(int(hour), int(code))] = n
+        for key, n in data["hour_methods"].items():
+            hour, method = key.split("|", 1)
+            rollup.hour_methods[(int(hour), method)] = n
+        return rollup
+
+
+def rollup_path(organization_id, day):
+    return os.path.join(api_rollup_dir, str(organization_id), f"{day}.json")
+
+
+def load_rollup(organization_id, day):
+    """Return the stored rollup of a day ("YYYY-MM-DD"), or None."""
+    try:
+        with open(rollup_path(organization_id, day)) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != ROLLUP_VERSION:
+        return None
+    return DayRollup.from_dict(data)
+
+
+def save_rollup(organization_id, day, rollup):
+    """Store the rollup of a closed day; written atomically."""
+    path = rollup_path(organization_id, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(rollup.to_dict(), f)
+    os.replace(path + ".tmp", path)
+
+
+class ApiUsageAggregator:
+    """Aggregates API request log entries in a single pass.
+
+    Keeps per-day counts by response code, by HTTP method and by admin and
+    response code, so the charts and tables never re-read the request log.
+    """
+
+    def __init__(self):
+        # "YYYY-MM-DD" -> DayRollup
+        self.days = {}
+
+    def add(self, entry):
+        day = entry["ts"][:10]
+        rollup = self.days.get(day)
+        if rollup is None:
+            rollup = self.days[day] = DayRollup()
+        code = entry["responseCode"]
+        hour = int(entry["ts"][11:13])
+        rollup.codes[code] += 1
+        rollup.methods[entry["method"]] += 1
+        rollup.hour_codes[(hour, code)] += 1
+        rollup.hour_methods[(hour, entry["method"])] += 1
+        admin_codes = rollup.admins.get(entry["adminId"])
+        if admin_codes is None:
+            admin_codes = rollup.admins[entry["adminId"]] = Counter()
+        admin_codes[code] += 1
+        rollup.paths[entry.get("path")] += 1
+
+    def update(self, entries):
+        """Add entries from a list or from a generator consumed page by page."""
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def dates(self):
+        return sorted(self.days)
+
+    def response_codes(self):
+        return sorted(set().union(*(rollup.codes for rollup in self.days.values())))
+
+    def methods(self):
+        return sorted(set().union(*(rollup.methods for rollup in self.days.values())))
+
+    def chart_bin(self):
+        """Bin size of the charts: "hour", "day" or "week", from the range length."""
+        dates = self.dates()
+        if not dates:
+            return "day"
+        days = (date.fromisoformat(dates[-1]) - date.fromisoformat(dates[0])).days + 1
+        if days <= chart_hourly_max_days:
+            return "hour"
+        if days <= chart_daily_max_days:
+            return "day"
+        return "week"
+
+    def binned_series(self, field, bin_size):
+        """Return (labels, {key: counts}) of "codes" or "methods" per bin.
+
+        Keeps the payload of long ranges small by binning days into weeks,
+        and short ranges readable by splitting days into hours.
+        """
+        keys = self.response_codes() if field == "codes" else self.methods()
+        if bin_size == "hour":
+            hourly = "hour_codes" if field == "codes" else "hour_methods"
+            labels = []
+            series = {key: [] for key in keys}
+            for day in self.dates():
+                counts = getattr(self.days[day], hourly)
+                for hour in range(24):
+                    labels.append(f"{day} {hour:02d}:00")
+                    for key in keys:
+                        series[key].append(counts[(hour, key)])
+            return labels, series
+
+        bins = {}
+        for day in self.dates():
+            label = day
+            if bin_size == "week":
+                # Weeks are labelled by their Monday
+                start = date.fromisoformat(day)
+                label = (start - timedelta(days=start.weekday())).isoformat()
+            bins.setdefault(label, Counter()).update(getattr(self.days[day], field))
+        labels = sorted(bins)
+        return labels, {key: [bins[label][key] for label in labels] for key in keys}
+
+    def admin_code_counts(self):
+        """adminId -> Counter of response codes over the whole range."""
+        totals = {}
+        for rollup in self.days.values():
+            for admin_id, codes in rollup.admins.items():
+                totals.setdefault(admin_id, Counter()).update(codes)
+        return totals
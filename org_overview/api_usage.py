@@ -1,18 +1,22 @@
 from pywebio.output import *
 from pywebio.input import input, DATE
 from pywebio import start_server
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pyecharts.charts import Bar, Pie
 from pyecharts import options as opts
-from utils import page_init
+from utils import page_init, loading, run_blocking
 from navigation import navigate_to_main
-from collections import defaultdict
 from config import *
+from cache import get_admins
+from api_rollup import ApiUsageAggregator, DayRollup, load_rollup, save_rollup
+from api_columns import ApiRequestColumns, columns_available, SECONDS_PER_DAY
+from fanout import iter_concurrent
+from charts import put_chart
 
 page_title = "API Usage Overview"
 
 
-def api_usage(main_func=None):
+async def api_usage(main_func=None):
     """Render header"""
     if main_func:
         page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
@@ -20,7 +24,7 @@ def api_usage(main_func=None):
         page_init(back_to_main_text, page_title)
 
     """Data ranges input"""
-    date_range = date_range_input()
+    date_range = await date_range_input()
 
     """Render header"""
     if main_func:
@@ -28,40 +32,126 @@ def api_usage(main_func=None):
     else:
         page_init(back_to_main_text, page_title)
 
-    data = fetch_api_statistics(dashboard, ORGANIZATION_ID, date_range)
+    # Paginated calls of dashboard_iterator yield entries while pages arrive,
+    # the rollups are read and written in a worker thread
+    with loading("Fetching data, please wait..."):
+        data = await run_blocking(
+            fetch_api_statistics, dashboard_iterator, ORGANIZATION_ID, date_range
+        )
 
     display_api_usage_pie_chart(data["api_overview"])
-    display_api_usage_stacked_bar_chart(data["api_details"])
-    display_method_usage_stacked_bar_chart(data["api_details"])
-    display_admin_response_code_table(data["api_details"], data["admins_info"])
+    display_api_usage_stacked_bar_chart(data["api_usage"])
+    display_method_usage_stacked_bar_chart(data["api_usage"])
+    display_admin_response_code_table(data["api_usage"], data["admins_info"])
 
 
 def fetch_api_statistics(dashboard, organization_id, date_range):
-    with put_loading():
-        put_text("Fetching data, please wait...")
+    with loading("Fetching data, please wait..."):
         api_overview = dashboard.organizations.getOrganizationApiRequestsOverview(
             organization_id, t0=date_range["t0"], t1=date_range["t1"]
         )
-        api_details = dashboard.organizations.getOrganizationApiRequests(
-            organization_id, t0=date_range["t0"], t1=date_range["t1"], total_pages="all"
+        api_usage = fetch_api_usage(
+            dashboard, organization_id, date_range["t0"], date_range["t1"]
         )
-        admins_info = dashboard.organizations.getOrganizationAdmins(organization_id)
+        admins_info = get_admins(dashboard, organization_id)
     return {
         "api_overview": api_overview,
-        "api_details": api_details,
+        "api_usage": api_usage,
         "admins_info": admins_info,
     }
 
 
-def date_range_input():
+def fetch_api_usage(dashboard, organization_id, t0, t1):
+    """Aggregate the API requests of the UTC days covering t0..t1.
+
+    Closed days are read from their stored rollup when available; only the
+    missing days and today are fetched from the API, as time shards fetched
+    in parallel and aggregated as soon as each shard completes.
+    """
+    api_usage = ApiUsageAggregator()
+    today = datetime.now(timezone.utc).date()
+    now = int(datetime.now(timezone.utc).timestamp())
+
+    # Days without a stored rollup are split into shards
+    missing = {}
+    shards = []
+    shard_seconds = api_usage_shard_hours * 3600
+    for day in utc_days(t0, t1):
+        day_key = day.isoformat()
+        rollup = load_rollup(organization_id, day_key) if day < today else None
+        if rollup is not None:
+            # Days without requests are stored so they are not fetched again,
+            # but not charted, as when they were just fetched
+            if rollup.codes:
+                api_usage.days[day_key] = rollup
+            continue
+
+        missing[day_key] = DayRollup()
+        day_start = int(
+            datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+        )
+        for shard_start in range(day_start, day_start + SECONDS_PER_DAY, shard_seconds):
+            if shard_start <= now:
+                shards.append((day_key, shard_start, shard_start + shard_seconds))
+
+    for (day_key, _, _), shard_usage in iter_concurrent(
+        lambda shard: fetch_api_usage_shard(dashboard, organization_id, *shard[1:]),
+        shards,
+    ):
+        if day_key in shard_usage.days:
+            missing[day_key].merge(shard_usage.days[day_key])
+
+    for day_key, rollup in missing.items():
+        if day_key < today.isoformat():
+            save_rollup(organization_id, day_key, rollup)
+        if rollup.codes:
+            api_usage.days[day_key] = rollup
+
+    # Days are kept in date order
+    api_usage.days = dict(sorted(api_usage.days.items()))
+    return api_usage
+
+
+def fetch_api_usage_shard(dashboard, organization_id, shard_start, shard_end):
+    """Fetch and aggregate the API requests of shard_start <= ts < shard_end."""
+    start = datetime.fromtimestamp(shard_start, timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%S"
+    )
+    end = datetime.fromtimestamp(shard_end, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    api_details = dashboard.organizations.getOrganizationApiRequests(
+        organization_id, t0=shard_start, t1=shard_end, total_pages="all"
+    )
+    # Shard bounds are shared by neighbours, keep each request in one shard only
+    return aggregate_api_requests(
+        entry for entry in api_details if start <= entry["ts"] < end
+    )
+
+
+def aggregate_api_requests(api_details):
+    """Single pass over a request log, with the configured backend."""
+    if api_usage_backend == "numpy" and columns_available():
+        return ApiRequestColumns().extend(api_details).to_aggregator()
+    return ApiUsageAggregator().update(api_details)
+
+
+def utc_days(t0, t1):
+    """UTC dates covering the t0..t1 unix timestamps."""
+    day = datetime.fromtimestamp(t0, timezone.utc).date()
+    last = datetime.fromtimestamp(t1, timezone.utc).date()
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+
+async def date_range_input():
     put_markdown("##### The time range is defaulted to the last 30 days")
     # Prompt for date range
-    t0_str = input(
+    t0_str = await input(
         "Enter the start date (YYYY-MM-DD):",
         type=DATE,
         value=(datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d"),
     )
-    t1_str = input(
+    t1_str = await input(
         "Enter the end date (YYYY-MM-DD):",
         type=DATE,
         value=datetime.now().strftime("%Y-%m-%d"),
@@ -98,76 +188,57 @@ def display_api_usage_pie_chart(data):
             .add("", [list(z) for z in zip(categories, values)])
             .set_global_opts(title_opts=opts.TitleOpts(title="API Usage Overview"))
         )
-        put_html(pie.render_notebook())
+        put_chart(pie)
     else:
         put_error("No API usage data available.")
 
 
-def display_api_usage_stacked_bar_chart(data):
+def display_api_usage_stacked_bar_chart(api_usage):
     """Renders a stacked bar chart for API usage data based on response codes."""
-    dates = sorted(set(entry["ts"][:10] for entry in data))
-    response_codes = sorted(set(entry["responseCode"] for entry in data))
-
-    counts = {date: {code: 0 for code in response_codes} for date in dates}
-
-    for entry in data:
-        date = entry["ts"][:10]
-        code = entry["responseCode"]
-        counts[date][code] += 1
-
-    x_data = dates
-    y_data = {code: [counts[date][code] for date in dates] for code in response_codes}
+    bin_size = api_usage.chart_bin()
+    labels, series = api_usage.binned_series("codes", bin_size)
 
     bar = Bar()
-    bar.add_xaxis(x_data)
-    for code, values in y_data.items():
+    bar.add_xaxis(labels)
+    for code, values in series.items():
         bar.add_yaxis(str(code), values, stack="stack1")
-    bar.set_global_opts(title_opts=opts.TitleOpts(title="API Usage over time"))
+    bar.set_global_opts(
+        title_opts=opts.TitleOpts(
+            title="API Usage over time", subtitle=f"Requests per {bin_size}"
+        )
+    )
 
-    put_html(bar.render_notebook())
+    put_chart(bar)
 
 
-def display_method_usage_stacked_bar_chart(data):
+def display_method_usage_stacked_bar_chart(api_usage):
     """Renders a stacked bar chart for HTTP method usage."""
-    dates = sorted(set(entry["ts"][:10] for entry in data))
-    methods = sorted(set(entry["method"] for entry in data))
-
-    counts = {date: {method: 0 for method in methods} for date in dates}
-
-    for entry in data:
-        date = entry["ts"][:10]
-        method = entry["method"]
-        counts[date][method] += 1
-
-    x_data = dates
-    y_data = {method: [counts[date][method] for date in dates] for method in methods}
+    bin_size = api_usage.chart_bin()
+    labels, series = api_usage.binned_series("methods", bin_size)
 
     bar = Bar()
-    bar.add_xaxis(x_data)
-    for method, values in y_data.items():
+    bar.add_xaxis(labels)
+    for method, values in series.items():
         bar.add_yaxis(method, values, stack="stack1")
-    bar.set_global_opts(title_opts=opts.TitleOpts(title="HTTP Method Usage over time"))
+    bar.set_global_opts(
+        title_opts=opts.TitleOpts(
+            title="HTTP Method Usage over time", subtitle=f"Requests per {bin_size}"
+        )
+    )
 
-    put_html(bar.render_notebook())
+    put_chart(bar)
 
 
-def display_admin_response_code_table(data, admins_info):
+def display_admin_response_code_table(api_usage, admins_info):
     """Displays a table with admin response code occurrences."""
     admin_details = {
         admin["id"]: {"name": admin["name"], "email": admin["email"]}
         for admin in admins_info
     }
 
-    admin_response_counts = defaultdict(lambda: defaultdict(int))
-
-    for entry in data:
-        admin_id = entry["adminId"]
-        response_code = entry["responseCode"]
-        admin_response_counts[admin_id][response_code] += 1
-
-    response_codes = sorted(set(entry["responseCode"] for entry in data))
+    response_codes = api_usage.response_codes()
     table_data = []
-    for admin_id, responses in admin_response_counts.items():
+    for admin_id, responses in api_usage.admin_code_counts().items():
         admin_info = admin_details.get(
             admin_id, {"name": "Unknown", "email": "Unknown"}
         )
@@ -187,7 +258,7 @@ def display_admin_response_code_table(data, admins_info):
 def main():
     """Main function for standalone execution"""
     # Start the server with the api_usage function
-    start_server(lambda: api_usage(), port=8999, debug=True)
+    start_server(api_usage, port=8999, debug=True)
 
 
 if __name__ == "__main__":
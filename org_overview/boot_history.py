@@ -0,0 +1,132 @@
+import time
+from datetime import datetime, timedelta, timezone
+from event_store import connect, write_lock
+from network_events import iter_network_events
+from config import (
+    event_store_min_sync_interval,
+    boot_history_backfill_days,
+    boot_history_days,
+    boot_history_max_pages,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS boot_events (
+    organization_id TEXT NOT NULL,
+    network_id TEXT NOT NULL,
+    serial TEXT NOT NULL,
+    occurred_at TEXT NOT NULL,
+    device_name TEXT,
+    description TEXT,
+    category TEXT,
+    reason TEXT,
+    UNIQUE (network_id, serial, occurred_at)
+);
+CREATE INDEX IF NOT EXISTS boot_events_history
+    ON boot_events (organization_id, occurred_at);
+CREATE TABLE IF NOT EXISTS boot_watermarks (
+    network_id TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+def connect_boot_history():
+    return connect(SCHEMA)
+
+
+def days_ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def sync_boot_events(dashboard, organization_id, network_id):
+    """Store the boot events of a switch network newer than its watermark.
+
+    Returns False when the network was synced too recently to be queried.
+    """
+    with connect_boot_history() as connection:
+        row = connection.execute(
+            "SELECT watermark, synced_at FROM boot_watermarks WHERE network_id = ?",
+            (network_id,),
+        ).fetchone()
+    watermark, synced_at = row if row else (days_ago(boot_history_backfill_days), 0)
+    if time.time() - synced_at < event_store_min_sync_interval:
+        return False
+
+    for events in iter_network_events(
+        dashboard,
+        network_id,
+        "switch",
+        t0=watermark,
+        direction="next",
+        max_pages=boot_history_max_pages,
+        includedEventTypes=["boot"],
+    ):
+        rows = [
+            (
+                organization_id,
+                network_id,
+                event.get("deviceSerial", "N/A"),
+                event["occurredAt"],
+                event.get("deviceName", "N/A"),
+                event.get("description", "N/A"),
+                event.get("category", "N/A"),
+                # Extract the reason from eventData if it exists
+                (event.get("eventData") or {}).get("reason", "N/A"),
+            )
+            for event in events
+        ]
+        watermark = max(watermark, max(event["occurredAt"] for event in events))
+        with write_lock, connect_boot_history() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO boot_events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO boot_watermarks VALUES (?, ?, ?)",
+                (network_id, watermark, time.time()),
+            )
+
+    with write_lock, connect_boot_history() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO boot_watermarks VALUES (?, ?, ?)",
+            (network_id, watermark, time.time()),
+        )
+    return True
+
+
+def boot_events(organization_id, network_id=None):
+    """Stored boot events of the last boot_history_days, newest first."""
+    query = (
+        "SELECT occurred_at, device_name, serial, description, category, reason"
+        " FROM boot_events WHERE organization_id = ? AND occurred_at >= ?"
+    )
+    params = [organization_id, days_ago(boot_history_days)]
+    if network_id is not None:
+        query += " AND network_id = ?"
+        params.append(network_id)
+    with connect_boot_history() as connection:
+        return connection.execute(
+            query + " ORDER BY occurred_at DESC", params
+        ).fetchall()
+
+
+def boot_counts(organization_id):
+    """Boots of the last boot_history_days per switch and per reason."""
+    params = (organization_id, days_ago(boot_history_days))
+    with connect_boot_history() as connection:
+        per_switch = connection.execute(
+            "SELECT serial, MAX(device_name), COUNT(*), MAX(occurred_at)"
+            " FROM boot_events WHERE organization_id = ? AND occurred_at >= ?"
+            " GROUP BY serial ORDER BY COUNT(*) DESC",
+            params,
+        ).fetchall()
+        per_reason = connection.execute(
+            "SELECT reason, COUNT(*) FROM boot_events"
+            " WHERE organization_id = ? AND occurred_at >= ?"
+            " GROUP BY reason ORDER BY COUNT(*) DESC",
+            params,
+        ).fetchall()
+    return per_switch, per_reason
@@ -0,0 +1,185 @@
+import threading
+import time
+from config import cache_ttl_seconds
+from singleflight import flights
+
+# Functions used to crawl each cached dataset. They call API methods shared
+# by DashboardAPI and meraki.aio's AsyncDashboardAPI, and return a coroutine
+# when called with the latter
+dataset_fetchers = {
+    "networks": lambda dashboard, organization_id: (
+        dashboard.organizations.getOrganizationNetworks(
+            organization_id, total_pages="all"
+        )
+    ),
+    "devices": lambda dashboard, organization_id: (
+        dashboard.organizations.getOrganizationDevices(
+            organization_id, total_pages="all"
+        )
+    ),
+    "devices_availabilities": lambda dashboard, organization_id: (
+        dashboard.organizations.getOrganizationDevicesAvailabilities(
+            organization_id, total_pages="all"
+        )
+    ),
+    "appliance_uplink_statuses": lambda dashboard, organization_id: (
+        dashboard.appliance.getOrganizationApplianceUplinkStatuses(
+            organization_id, total_pages="all"
+        )
+    ),
+    "admins": lambda dashboard, organization_id: (
+        dashboard.organizations.getOrganizationAdmins(organization_id)
+    ),
+}
+
+_lock = threading.Lock()
+# (dataset, organization_id, *args) -> (fetched_at, value)
+_entries = {}
+# Misses that waited for the crawl of another caller are also "shared"
+_stats = {
+    dataset: {"hits": 0, "misses": 0, "shared": 0} for dataset in dataset_fetchers
+}
+
+
+def register_dataset(dataset, fetcher):
+    """Add a dataset fetched as fetcher(dashboard, organization_id, *args).
+
+    Only get_dataset crawls it, unless fetcher makes a single API call as
+    the fetchers above do.
+    """
+    with _lock:
+        dataset_fetchers[dataset] = fetcher
+        _stats.setdefault(dataset, {"hits": 0, "misses": 0, "shared": 0})
+
+
+def get_dataset(dataset, dashboard, organization_id, *args):
+    """Return a dataset from the cache, crawling the API when missing or expired.
+
+    Concurrent misses of the same entry share a single crawl. The returned
+    value is shared between sessions and must not be modified.
+    """
+    key = (dataset, organization_id, *args)
+    entry = _lookup(key)
+    if entry is not None:
+        return entry[1]
+
+    value, shared = flights.do(key, _crawl, key, dashboard)
+    if shared:
+        _count_shared(dataset)
+    return value
+
+
+async def get_dataset_async(dataset, aio_dashboard, organization_id, *args):
+    """Same as get_dataset, crawling through meraki.aio on a miss.
+
+    Both share the cache entries, whichever path crawled a dataset.
+    """
+    key = (dataset, organization_id, *args)
+    entry = _lookup(key)
+    if entry is not None:
+        return entry[1]
+
+    value, shared = await flights.do_async(key, _crawl_async, key, aio_dashboard)
+    if shared:
+        _count_shared(dataset)
+    return value
+
+
+def _lookup(key):
+    """Return the (fetched_at, value) entry of key if fresh, counting hits/misses."""
+    dataset = key[0]
+    with _lock:
+        entry = _entries.get(key)
+        if entry and time.monotonic() - entry[0] < cache_ttl_seconds[dataset]:
+            _stats[dataset]["hits"] += 1
+            return entry
+        _stats[dataset]["misses"] += 1
+    return None
+
+
+def _store(key, value):
+    with _lock:
+        _entries[key] = (time.monotonic(), value)
+    return value
+
+
+def _crawl(key, dashboard):
+    dataset, organization_id, *args = key
+    return _store(key, dataset_fetchers[dataset](dashboard, organization_id, *args))
+
+
+async def _crawl_async(key, aio_dashboard):
+    dataset, organization_id, *args = key
+    fetch = dataset_fetchers[dataset](aio_dashboard, organization_id, *args)
+    return _store(key, await fetch)
+
+
+def _count_shared(dataset):
+    with _lock:
+        _stats[dataset]["shared"] += 1
+
+
+def refresh(dataset, dashboard, organization_id, *args):
+    """Crawl a dataset and replace its cache entry, whatever its age.
+
+    A crawl of the entry already in flight is joined instead.
+    """
+    key = (dataset, organization_id, *args)
+    value, _ = flights.do(key, _crawl, key, dashboard)
+    return value
+
+
+def get_networks(dashboard, organization_id):
+    return get_dataset("networks", dashboard, organization_id)
+
+
+def get_devices(dashboard, organization_id):
+    return get_dataset("devices", dashboard, organization_id)
+
+
+def get_devices_availabilities(dashboard, organization_id):
+    return get_dataset("devices_availabilities", dashboard, organization_id)
+
+
+def get_appliance_uplink_statuses(dashboard, organization_id):
+    return get_dataset("appliance_uplink_statuses", dashboard, organization_id)
+
+
+def get_admins(dashboard, organization_id):
+    return get_dataset("admins", dashboard, organization_id)
+
+
+def invalidate(dataset=None, organization_id=None):
+    """Drop cached entries, optionally limited to a dataset and/or organization."""
+    with _lock:
+        for key in list(_entries):
+            if dataset is not None and key[0] != dataset:
+                continue
+            if organization_id is not None and key[1] != organization_id:
+                continue
+            del _entries[key]
+
+
+def cache_stats():
+    """Return hit/miss counters and entry age for every dataset."""
+    now = time.monotonic()
+    with _lock:
+        stats = []
+        for dataset, counters in _stats.items():
+            ages = [
+                round(now - fetched_at)
+                for key, (fetched_at, _) in _entries.items()
+                if key[0] == dataset
+            ]
+            stats.append(
+                {
+                    "Dataset": dataset,
+                    "Hits": counters["hits"],
+                    "Misses": counters["misses"],
+                    "Shared": counters["shared"],
+                    "Entries": len(ages),
+                    "Oldest (s)": max(ages) if ages else "-",
+                    "TTL (s)": cache_ttl_seconds[dataset],
+                }
+            )
+    return stats
@@ -0,0 +1,43 @@
+import json
+from pywebio.output import put_html
+from pywebio.session import run_js, local
+
+ECHARTS_URL = "https://assets.pyecharts.org/assets/v5/echarts.min.js"
+
+LOAD_ECHARTS_JS = """
+if (!window.echarts && !document.getElementById("echarts-lib")) {
+    var script = document.createElement("script");
+    script.id = "echarts-lib";
+    script.src = url;
+    document.head.appendChild(script);
+}
+"""
+
+# Waits for the library, loaded asynchronously, before drawing
+DRAW_CHART_JS = """
+(function draw() {
+    if (!window.echarts) {
+        return setTimeout(draw, 50);
+    }
+    echarts.init(document.getElementById(chart_id)).setOption(options);
+})();
+"""
+
+
+def load_echarts():
+    """Ship the ECharts library to the browser once per session."""
+    if not local.echarts_loaded:
+        run_js(LOAD_ECHARTS_JS, url=ECHARTS_URL)
+        local.echarts_loaded = True
+
+
+def put_chart(chart, height="500px"):
+    """Render a pyecharts chart by sending only its options as compact JSON."""
+    load_echarts()
+    chart_id = f"chart_{chart.chart_id}"
+    put_html(f'<div id="{chart_id}" style="width:100%;height:{height};"></div>')
+    run_js(
+        DRAW_CHART_JS,
+        chart_id=chart_id,
+        options=json.loads(chart.dump_options_with_quotes()),
+    )
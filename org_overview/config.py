@@ -1,6 +1,9 @@
 # config.py
 import os
 import meraki
+import meraki.aio
+from rate_limit import install_rate_limiter, install_async_rate_limiter
+from metrics import install_metrics, install_async_metrics
 
 # Retrieve API key and organization ID from environment variables
 if True:  # Modify this condition based on your configuration needs
@@ -10,8 +13,52 @@ else:
     API_KEY = os.getenv("MK_TEST_API")
     ORGANIZATION_ID = os.getenv("MK_MAIN_ORG")
 
+# Organizations of the multi-organization mode, comma separated; when
+# empty, every organization the API key can access is used
+organization_ids = [
+    organization_id.strip()
+    for organization_id in os.getenv("MK_CSM_ORGS", "").split(",")
+    if organization_id.strip()
+]
+# Organizations whose reports run in parallel in multi-organization mode
+org_max_workers = 4
+
+# Dashboard API base URL, e.g. the local stand-in of the benchmarks
+base_url = os.getenv("MK_BASE_URL", "https://api.meraki.com/api/v1")
+
+# Dashboard API requests per second allowed for the organization
+org_rate_limit_per_second = float(os.getenv("MK_RATE_LIMIT", "10"))
+
 # Initialize the Meraki Dashboard API
-dashboard = meraki.DashboardAPI(API_KEY, suppress_logging=True)
+dashboard = meraki.DashboardAPI(API_KEY, base_url=base_url, suppress_logging=True)
+# Same API, but paginated calls return generators consumed page by page
+dashboard_iterator = meraki.DashboardAPI(
+    API_KEY, base_url=base_url, suppress_logging=True, use_iterator_for_get_pages=True
+)
+# Record every request, below the rate limiter so queueing is not counted
+install_metrics(dashboard)
+install_metrics(dashboard_iterator)
+# Every session shares the organization budget
+install_rate_limiter(dashboard, ORGANIZATION_ID, org_rate_limit_per_second)
+install_rate_limiter(dashboard_iterator, ORGANIZATION_ID, org_rate_limit_per_second)
+
+# Maximum number of per-network API calls running in parallel
+max_concurrent_requests = 8
+
+# Blocking fetches of the page sessions running at the same time, each one
+# may fan out to max_concurrent_requests threads
+page_max_workers = 4
+
+# Asyncio API of the coroutine based pages, its httpx client is bound to the
+# event loop of the PyWebIO server the first time it sends a request
+aio_dashboard = meraki.aio.AsyncDashboardAPI(
+    API_KEY,
+    base_url=base_url,
+    suppress_logging=True,
+    maximum_concurrent_requests=max_concurrent_requests,
+)
+install_async_metrics(aio_dashboard)
+install_async_rate_limiter(aio_dashboard, ORGANIZATION_ID, org_rate_limit_per_second)
 
 back_to_main_text = "Back to Menu"
 
@@ -48,3 +95,76 @@ logs_events_selected = {
 }
 
 css_style = "#output-container{max-width: none;}"
+
+# Time-to-live (seconds) of the shared organization datasets cache
+cache_ttl_seconds = {
+    "networks": 300,
+    "devices": 300,
+    "devices_availabilities": 60,
+    "appliance_uplink_statuses": 60,
+    "admins": 600,
+    "event_types": 86400,
+}
+
+# Seconds after which a page stops waiting for a single network
+network_fetch_timeout = 60
+
+# Local Prometheus endpoint of the API metrics, 0 disables it
+metrics_port = int(os.getenv("MK_METRICS_PORT", "9108"))
+
+# Background refresh of the cached datasets, enabled with MK_PREFETCH=true
+prefetch_enabled = os.getenv("MK_PREFETCH", "false").lower() == "true"
+prefetch_datasets = [
+    "networks",
+    "devices",
+    "devices_availabilities",
+    "appliance_uplink_statuses",
+    "admins",
+]
+# Fraction of the TTL after which a dataset is refreshed
+prefetch_ttl_ratio = 0.8
+
+# Local storage (SQLite event store, rollups, ...)
+data_dir = os.getenv("MK_DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
+
+# Per page timing panel and log of the API, processing and UI phases,
+# enabled with MK_PROFILE=true
+profile_enabled = os.getenv("MK_PROFILE", "false").lower() == "true"
+profile_log_path = os.path.join(data_dir, "profile.jsonl")
+profile_log_max_bytes = 1024 * 1024
+profile_log_backups = 5
+
+# Logs Overview counts the events of the last logs_overview_window_hours,
+# from the local event store or by streaming the event log of every network.
+# Both page through the whole window by default.
+logs_overview_window_hours = 24
+logs_event_store_enabled = True
+
+# Logs Overview event store
+event_store_path = os.path.join(data_dir, "events.sqlite3")
+# History pulled the first time a network is synced, and kept afterwards
+event_store_retention_days = 7
+# Networks synced more recently than this are not queried again
+event_store_min_sync_interval = 60
+# Pages fetched per network and sync, None pages up to the newest event.
+# With a cap, the counts are shown as partial until later syncs catch up.
+event_store_max_pages = None
+
+# MS Reboot Reason boot history, kept in the event store database
+boot_history_backfill_days = 90
+boot_history_days = 180
+boot_history_max_pages = 10
+
+# API Usage aggregation backend: "python", or "numpy" for a columnar request
+# log with vectorized group-bys (falls back to "python" without numpy)
+api_usage_backend = "python"
+
+# API Usage per-day rollups of closed (past, UTC) days
+api_rollup_dir = os.path.join(data_dir, "api_rollups")
+# Missing days are fetched as shards of this many hours, in parallel
+api_usage_shard_hours = 6
+
+# API Usage charts bin by hour up to chart_hourly_max_days, by day up to
+# chart_daily_max_days and by week beyond
+chart_hourly_max_days = 2
+chart_daily_max_days = 92
@@ -0,0 +1,49 @@
+from pywebio.output import *
+from pywebio import start_server
+from utils import page_init
+from navigation import navigate_to_main
+from config import *
+from metrics import metrics_rows
+from cache import cache_stats
+from rate_limit import rate_limit_stats
+
+page_title = "Diagnostics"
+
+
+async def diagnostics(main_func=None):
+    """Render header"""
+    if main_func:
+        page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
+    else:
+        page_init(back_to_main_text, page_title)
+
+    put_buttons(["Reload"], onclick=[lambda: diagnostics(main_func)])
+
+    # API requests per page and endpoint, since the server started
+    put_markdown("### Dashboard API")
+    if metrics_port:
+        put_text(f"Prometheus metrics: http://127.0.0.1:{metrics_port}/metrics")
+    display_table(metrics_rows())
+
+    put_markdown("### Cache")
+    display_table(cache_stats())
+
+    put_markdown("### Rate limiter")
+    display_table(rate_limit_stats())
+
+
+def display_table(rows):
+    if rows:
+        put_datatable(rows, height=300)
+    else:
+        put_text("No data yet.")
+
+
+def main():
+    """Main function for standalone execution"""
+    # Start the server with the diagnostics function
+    start_server(diagnostics, port=8999, debug=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
-from pywebio.output import put_text, put_loading, put_datatable
+from pywebio.output import put_text, put_scope, put_datatable, datatable_insert
 from pywebio import start_server
-from utils import page_init
+from utils import page_init, loading, iter_blocking
 from navigation import navigate_to_main
 from config import dashboard, ORGANIZATION_ID
 from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+from timeline import merge_timeline, batched, time_key
 import pytz
 
 page_title = "Ms Reboot Reason"
 back_to_main_text = "Back to Main"
+table_id = "alert_correlation"
+column_order = ["Time", "Source", "Device", "Category", "Description", "Info"]
 
 # Constants and configuration from previous script
 FS = "---"
@@ -23,6 +27,12 @@ delta_times_minutes = {
     "deviceLogStop": 5,
     "deviceStatusNext": 5,
 }
+# Alert windows closer than this are covered by a single status history call
+status_history_max_gap = timedelta(hours=6)
+status_history_serials_per_call = 100
+# Page size and page cap of the windowed device event log calls
+event_log_per_page = 500
+event_log_max_pages = 5
 inTable = {"changeLog": True, "eventLog": True, "orgAlert": True, "deviceStatus": True}
 
 log_device_type_mapping = {
@@ -43,215 +53,388 @@ event_names = {
 }
 
 
-def alert_correlation(main_func=None):
+async def alert_correlation(main_func=None):
     """Render header and fetch data"""
     if main_func:
         page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
     else:
         page_init(back_to_main_text, page_title)
 
-    data = fetch_function(dashboard, ORGANIZATION_ID)
+    row_count = 0
+
+    # put_loading removes its scope on exit, the table gets its own scope outside it
+    put_scope(table_id)
+    with loading("Fetching data, please wait..."):
+        # Rows are pushed to the table as the timeline is merged
+        async for batch in iter_blocking(
+            batched(iter_function(dashboard, ORGANIZATION_ID), 500)
+        ):
+            if not row_count:
+                put_datatable(
+                    batch,
+                    column_order=column_order,
+                    instance_id=table_id,
+                    scope=table_id,
+                )
+            else:
+                datatable_insert(table_id, batch)
+            row_count += len(batch)
 
-    if not data:
+    if not row_count:
         put_text("No data available to display.")
-    else:
-        column_order = ["Time", "Source", "Device", "Category", "Description", "Info"]
-        put_datatable(data, column_order=column_order)
 
 
 def fetch_function(dashboard, organization_id):
-    with put_loading():
-        put_text("Fetching data, please wait...")
-
-        alert_tsStart = (
-            datetime.now(pytz.timezone("UTC")) - timedelta(days=orgAlertDaysDeltaTimes)
-        ).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        data = []
+    with loading("Fetching data, please wait..."):
+        return list(iter_function(dashboard, organization_id))
+
+
+def iter_function(dashboard, organization_id):
+    """Yield the correlation rows, alert by alert, in time order."""
+    alert_tsStart = (
+        datetime.now(pytz.timezone("UTC")) - timedelta(days=orgAlertDaysDeltaTimes)
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    function_args = {
+        "total_pages": "all",
+        "resolved": True,
+        "active": False,
+        "tsStart": alert_tsStart,
+    }
+
+    if alerts_type_of_alerts:
+        function_args["types"] = alerts_type_of_alerts
+
+    alerts = dashboard.organizations.getOrganizationAssuranceAlerts(
+        organization_id, **function_args
+    )
+
+    alerts = [
+        alert for alert in alerts if alert["deviceType"] in alerts_type_of_devices
+    ]
+
+    # Fetch device status changes of every alert with a few org-wide calls
+    if inTable["deviceStatus"]:
+        status_history = fetch_status_history(
+            dashboard,
+            organization_id,
+            [
+                (device["serial"], alert["startedAt"], status_window_end(alert))
+                for alert in alerts
+                for device in alert["scope"]["devices"]
+            ],
+        )
 
-        function_args = {
-            "total_pages": "all",
-            "resolved": True,
-            "active": False,
-            "tsStart": alert_tsStart,
+    # Device events fetched so far, reused by overlapping alert windows
+    event_cache = NetworkEventCache()
+
+    for alert in alerts:
+        yield {
+            "Time": alert["deviceType"],
+            "Source": FS,
+            "Device": FS,
+            "Category": FS,
+            "Description": FS,
+            "Info": FS,
         }
 
-        if alerts_type_of_alerts:
-            function_args["types"] = alerts_type_of_alerts
-
-        alerts = dashboard.organizations.getOrganizationAssuranceAlerts(
-            organization_id, **function_args
-        )
-
-        for alert in alerts:
-            if alert["deviceType"] not in alerts_type_of_devices:
-                continue
-            row = {
-                "Time": alert["deviceType"],
-                "Source": FS,
-                "Device": FS,
-                "Category": FS,
-                "Description": FS,
-                "Info": FS,
-            }
-            data.append(row)
-            alert_data = []
-            for device in alert["scope"]["devices"]:
-                dt_eventStart = datetime.strptime(
-                    alert["startedAt"], "%Y-%m-%dT%H:%M:%SZ"
-                )
-                dt_eventResolved = datetime.strptime(
-                    alert["resolvedAt"], "%Y-%m-%dT%H:%M:%SZ"
+        # Every source below is a stream already sorted by time
+        streams = []
+        for device in alert["scope"]["devices"]:
+            dt_eventStart = datetime.strptime(alert["startedAt"], "%Y-%m-%dT%H:%M:%SZ")
+            dt_eventResolved = datetime.strptime(
+                alert["resolvedAt"], "%Y-%m-%dT%H:%M:%SZ"
+            )
+
+            # Add alert start and stop
+            streams.append(alert_rows(alert, device, dt_eventStart, dt_eventResolved))
+
+            # Fetch device status changes
+            if inTable["deviceStatus"]:
+                streams.append(
+                    status_rows(
+                        status_history.window(
+                            device["serial"],
+                            alert["startedAt"],
+                            status_window_end(alert),
+                        )
+                    )
                 )
 
-                # Add alert start and stop to data
-                alert_data.append(
-                    {
-                        "Time": dt_eventStart.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-                        "Source": event_names["orgAlert"],
-                        "Device": device["name"],
-                        "Category": alert["type"],
-                        "Description": ">>> STARTED",
-                        "Info": FS,
-                    }
+            # Fetch admin changes
+            if inTable["changeLog"]:
+                changeT0 = (
+                    dt_eventStart
+                    - timedelta(minutes=delta_times_minutes["changelogStart"])
+                ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+                changeT1 = (
+                    dt_eventStart
+                    + timedelta(minutes=delta_times_minutes["changelogStop"])
+                ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+                changes = dashboard.organizations.getOrganizationConfigurationChanges(
+                    organization_id,
+                    total_pages=3,
+                    networkId=alert["network"]["id"],
+                    t0=changeT0,
+                    t1=changeT1,
                 )
-
-                alert_data.append(
-                    {
-                        "Time": dt_eventResolved.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-                        "Source": event_names["orgAlert"],
-                        "Device": device["name"],
-                        "Category": alert["type"],
-                        "Description": "<<< STOPPED",
-                        "Info": FS,
-                    }
+                # At most 3 pages, the API order is not guaranteed
+                changes.sort(key=lambda change: time_key(change["ts"]))
+                streams.append(change_rows(changes))
+
+            # Fetch device logs
+            if inTable["eventLog"]:
+                logDeltaBeforeStr = (
+                    dt_eventStart
+                    - timedelta(minutes=delta_times_minutes["deviceLogStart"])
+                ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+                logDeltaAfterStr = (
+                    dt_eventResolved
+                    + timedelta(minutes=delta_times_minutes["deviceLogStop"])
+                ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+                events = event_cache.window(
+                    dashboard,
+                    alert["network"]["id"],
+                    device["serial"],
+                    log_device_type_mapping[alert["deviceType"]],
+                    logDeltaBeforeStr,
+                    logDeltaAfterStr,
                 )
+                streams.append(event_rows(events))
+
+        # Merge the alert-related streams by time
+        yield from merge_timeline(*streams)
+
+
+def alert_rows(alert, device, dt_eventStart, dt_eventResolved):
+    yield {
+        "Time": dt_eventStart.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "Source": event_names["orgAlert"],
+        "Device": device["name"],
+        "Category": alert["type"],
+        "Description": ">>> STARTED",
+        "Info": FS,
+    }
+    yield {
+        "Time": dt_eventResolved.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "Source": event_names["orgAlert"],
+        "Device": device["name"],
+        "Category": alert["type"],
+        "Description": "<<< STOPPED",
+        "Info": FS,
+    }
+
+
+def status_rows(statusChanges):
+    for stat in statusChanges:
+        yield {
+            "Time": stat["ts"],
+            "Source": event_names["status"],
+            "Device": stat["device"]["name"],
+            "Category": stat["details"]["new"][0]["value"],
+            "Description": (
+                stat["details"]["new"][1]["value"]
+                if len(stat["details"]["new"]) > 1
+                else FS
+            ),
+            "Info": FS,
+        }
 
-                # Fetch device status changes
-                if inTable["deviceStatus"]:
-                    logAfterString = (
-                        dt_eventResolved
-                        + timedelta(minutes=delta_times_minutes["deviceLogStop"])
-                    ).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-                    statusChanges = dashboard.organizations.getOrganizationDevicesAvailabilitiesChangeHistory(
-                        organization_id,
-                        total_pages="all",
-                        t0=alert["startedAt"],
-                        t1=logAfterString,
-                        serials=device["serial"],
-                    )
-
-                    for stat in statusChanges:
-                        row = {
-                            "Time": stat["ts"],
-                            "Source": event_names["status"],
-                            "Device": stat["device"]["name"],
-                            "Category": stat["details"]["new"][0]["value"],
-                            "Description": (
-                                stat["details"]["new"][1]["value"]
-                                if len(stat["details"]["new"]) > 1
-                                else FS
-                            ),
-                            "Info": FS,
-                        }
-                        alert_data.append(row)
-
-                # Fetch admin changes
-                if inTable["changeLog"]:
-                    changeT0 = (
-                        dt_eventStart
-                        - timedelta(minutes=delta_times_minutes["changelogStart"])
-                    ).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-                    changeT1 = (
-                        dt_eventStart
-                        + timedelta(minutes=delta_times_minutes["changelogStop"])
-                    ).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-                    changes = (
-                        dashboard.organizations.getOrganizationConfigurationChanges(
-                            organization_id,
-                            total_pages=3,
-                            networkId=alert["network"]["id"],
-                            t0=changeT0,
-                            t1=changeT1,
-                        )
-                    )
 
-                    for change in changes:
-                        row = {
-                            "Time": change["ts"],
-                            "Source": event_names["change"],
-                            "Device": change["adminName"],
-                            "Category": change["page"],
-                            "Description": change["label"],
-                            "Info": str(change["newValue"])[:MAX_LEN],
-                        }
-                        alert_data.append(row)
-
-                # Fetch device logs
-                if inTable["eventLog"]:
-                    logDeltaBeforeStr = (
-                        dt_eventStart
-                        - timedelta(minutes=delta_times_minutes["deviceLogStart"])
-                    ).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-                    logDeltaAfterStr = (
-                        dt_eventResolved
-                        + timedelta(minutes=delta_times_minutes["deviceLogStop"])
-                    ).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-                    events = dashboard.networks.getNetworkEvents(
-                        alert["network"]["id"],
-                        perPage=500,
-                        deviceSerial=device["serial"],
-                        productType=log_device_type_mapping[alert["deviceType"]],
-                        excludedEventTypes=log_excluded_event_types,
-                    )
+def change_rows(changes):
+    for change in changes:
+        yield {
+            "Time": change["ts"],
+            "Source": event_names["change"],
+            "Device": change["adminName"],
+            "Category": change["page"],
+            "Description": change["label"],
+            "Info": str(change["newValue"])[:MAX_LEN],
+        }
 
-                    for event in events["events"]:
-                        event_time = datetime.strptime(
-                            event["occurredAt"], "%Y-%m-%dT%H:%M:%S.%fZ"
-                        )
-                        if event_time < datetime.strptime(
-                            logDeltaBeforeStr, "%Y-%m-%dT%H:%M:%SZ"
-                        ):
-                            continue
-                        if event_time > datetime.strptime(
-                            logDeltaAfterStr, "%Y-%m-%dT%H:%M:%SZ"
-                        ):
-                            continue
-
-                        client = (
-                            event.get("clientDescription")
-                            or event.get("clientMac")
-                            or event.get("deviceName")
-                            or "-"
-                        )
 
-                        row = {
-                            "Time": event["occurredAt"],
-                            "Source": event_names["event"],
-                            "Device": client,
-                            "Category": event["category"],
-                            "Description": event["description"],
-                            "Info": str(event["eventData"])[:MAX_LEN],
-                        }
-                        alert_data.append(row)
+def event_rows(events):
+    for event in events:
+        client = (
+            event.get("clientDescription")
+            or event.get("clientMac")
+            or event.get("deviceName")
+            or "-"
+        )
 
-            # Sort the alert-related data by time
-            alert_data.sort(key=lambda x: x["Time"])
+        yield {
+            "Time": event["occurredAt"],
+            "Source": event_names["event"],
+            "Device": client,
+            "Category": event["category"],
+            "Description": event["description"],
+            "Info": str(event["eventData"])[:MAX_LEN],
+        }
 
-            # Extend the main data list with the sorted alert data
-            data.extend(alert_data)
 
-        return data
+def status_window_end(alert):
+    """End of the device status window of an alert."""
+    return (
+        datetime.strptime(alert["resolvedAt"], "%Y-%m-%dT%H:%M:%SZ")
+        + timedelta(minutes=delta_times_minutes["deviceLogStop"])
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class StatusHistoryIndex:
+    """Device status changes indexed by serial and time."""
+
+    def __init__(self):
+        # serial -> sorted timestamps and the matching status changes
+        self._times = {}
+        self._changes = {}
+
+    def add(self, changes):
+        by_serial = {}
+        for change in changes:
+            by_serial.setdefault(change["device"]["serial"], []).append(change)
+        for serial, serial_changes in by_serial.items():
+            merged = self._changes.get(serial, []) + serial_changes
+            merged.sort(key=lambda change: time_key(change["ts"]))
+            self._changes[serial] = merged
+            self._times[serial] = [time_key(change["ts"]) for change in merged]
+
+    def window(self, serial, t0, t1):
+        """Status changes of serial between t0 and t1 (inclusive, ISO strings)."""
+        times = self._times.get(serial, [])
+        start = bisect_left(times, time_key(t0))
+        stop = bisect_right(times, time_key(t1))
+        return self._changes.get(serial, [])[start:stop]
+
+
+class NetworkEventCache:
+    """Device events per (network, serial, productType) and the time ranges fetched."""
+
+    def __init__(self):
+        # key -> sorted [start, end] ranges already fetched
+        self._covered = {}
+        # key -> events sorted by time, their timestamps and their identities
+        self._events = {}
+        self._times = {}
+        self._seen = {}
+
+    def window(self, dashboard, network_id, serial, product_type, t0, t1):
+        """Events between t0 and t1 (ISO strings), fetching only what is not cached."""
+        key = (network_id, serial, product_type)
+        for start, end in self._gaps(key, t0, t1):
+            response = dashboard.networks.getNetworkEvents(
+                network_id,
+                total_pages=event_log_max_pages,
+                perPage=event_log_per_page,
+                deviceSerial=serial,
+                productType=product_type,
+                excludedEventTypes=log_excluded_event_types,
+                startingAfter=start,
+                endingBefore=end,
+            )
+            self._add_events(key, response["events"])
+            # Pages go back in time, a truncated fetch only covers the newest part
+            page_start = response.get("pageStartAt") or start
+            self._add_covered(key, max(start, time_key(page_start) + "Z"), end)
+
+        times = self._times.get(key, [])
+        first = bisect_left(times, time_key(t0))
+        last = bisect_right(times, time_key(t1))
+        return self._events.get(key, [])[first:last]
+
+    def _gaps(self, key, t0, t1):
+        gaps = []
+        cursor = t0
+        for start, end in self._covered.get(key, []):
+            if end <= cursor:
+                continue
+            if start >= t1:
+                break
+            if start > cursor:
+                gaps.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < t1:
+            gaps.append((cursor, t1))
+        return gaps
+
+    def _add_covered(self, key, start, end):
+        ranges = sorted(self._covered.get(key, []) + [[start, end]])
+        merged = [ranges[0]]
+        for range_start, range_end in ranges[1:]:
+            if range_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+        self._covered[key] = merged
+
+    def _add_events(self, key, events):
+        seen = self._seen.setdefault(key, set())
+        new_events = []
+        for event in events:
+            identity = (
+                event["occurredAt"],
+                event["type"],
+                event.get("clientMac"),
+                event["description"],
+            )
+            if identity not in seen:
+                seen.add(identity)
+                new_events.append(event)
+        if not new_events:
+            return
+        merged = self._events.get(key, []) + new_events
+        merged.sort(key=lambda event: time_key(event["occurredAt"]))
+        self._events[key] = merged
+        self._times[key] = [time_key(event["occurredAt"]) for event in merged]
+
+
+def plan_status_history_fetches(windows, max_gap=status_history_max_gap):
+    """Merge (serial, t0, t1) windows into as few (t0, t1, serials) fetches as possible.
+
+    Windows overlapping or separated by less than max_gap share one fetch.
+    """
+    fetches = []
+    for serial, t0, t1 in sorted(windows, key=lambda window: window[1]):
+        start = datetime.strptime(t0, "%Y-%m-%dT%H:%M:%SZ")
+        stop = datetime.strptime(t1, "%Y-%m-%dT%H:%M:%SZ")
+        if fetches and start - fetches[-1][1] <= max_gap:
+            fetches[-1][1] = max(fetches[-1][1], stop)
+            fetches[-1][2].add(serial)
+        else:
+            fetches.append([start, stop, {serial}])
+    return [
+        (
+            start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            stop.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            sorted(serials),
+        )
+        for start, stop, serials in fetches
+    ]
+
+
+def fetch_status_history(dashboard, organization_id, windows):
+    """Fetch the status changes covering all windows and index them locally."""
+    index = StatusHistoryIndex()
+    for t0, t1, serials in plan_status_history_fetches(windows):
+        for i in range(0, len(serials), status_history_serials_per_call):
+            index.add(
+                dashboard.organizations.getOrganizationDevicesAvailabilitiesChangeHistory(
+                    organization_id,
+                    total_pages="all",
+                    t0=t0,
+                    t1=t1,
+                    serials=serials[i : i + status_history_serials_per_call],
+                )
+            )
+    return index
 
 
 def main():
     """Main function for standalone execution"""
-    start_server(lambda: alert_correlation(), port=8999, debug=True)
+    start_server(alert_correlation, port=8999, debug=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta, timezone
+from config import (
+    event_store_path,
+    event_store_retention_days,
+    event_store_min_sync_interval,
+    event_store_max_pages,
+)
+from network_events import iter_network_events
+
+write_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    organization_id TEXT NOT NULL,
+    network_id TEXT NOT NULL,
+    product_type TEXT NOT NULL,
+    occurred_at TEXT NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT,
+    -- Part of the unique key: '' rather than NULL, as NULLs are all distinct
+    description TEXT NOT NULL DEFAULT '',
+    device_serial TEXT NOT NULL DEFAULT '',
+    client_id TEXT NOT NULL DEFAULT '',
+    UNIQUE (network_id, product_type, occurred_at, type, device_serial, client_id,
+            description)
+);
+CREATE INDEX IF NOT EXISTS events_counts
+    ON events (organization_id, product_type, type, occurred_at);
+CREATE TABLE IF NOT EXISTS sync_watermarks (
+    network_id TEXT NOT NULL,
+    product_type TEXT NOT NULL,
+    watermark TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    -- 0 when event_store_max_pages stopped the sync before the newest events
+    complete INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (network_id, product_type)
+);
+"""
+
+
+_schema_lock = threading.Lock()
+# (database path, schema) already created by this process
+_created_schemas = set()
+
+
+@contextmanager
+def connect(schema=None):
+    """Open the event store for a with block, creating it on first use.
+
+    The block's changes are committed (rolled back on error) and the
+    connection is closed on exit. The events schema, and schema when given
+    (e.g. the boot history tables), are created once per process rather
+    than on every open.
+    """
+    os.makedirs(os.path.dirname(event_store_path), exist_ok=True)
+    with closing(sqlite3.connect(event_store_path, timeout=30)) as connection:
+        with _schema_lock:
+            for script in (SCHEMA, schema):
+                if script is None or (event_store_path, script) in _created_schemas:
+                    continue
+                connection.executescript(script)
+                _created_schemas.add((event_store_path, script))
+        with connection:
+            yield connection
+
+
+def retention_start():
+    return (
+        datetime.now(timezone.utc) - timedelta(days=event_store_retention_days)
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def get_watermark(connection, network_id, product_type):
+    """Return (watermark, synced_at, complete), (None, 0, False) if never synced."""
+    row = connection.execute(
+        "SELECT watermark, synced_at, complete FROM sync_watermarks"
+        " WHERE network_id = ? AND product_type = ?",
+        (network_id, product_type),
+    ).fetchone()
+    return (row[0], row[1], bool(row[2])) if row else (None, 0, False)
+
+
+def sync_network(dashboard, organization_id, network_id, product_type, since=None):
+    """Store the events of a network newer than its watermark and than since.
+
+    since is the start of the window the events are counted for (the
+    retention start by default): a network whose watermark is older starts
+    at since, so its first pages fall in the window. Returns whether the
+    stored events are complete up to now, False when event_store_max_pages
+    stopped the sync; the next sync continues from the watermark.
+    """
+    with connect() as connection:
+        watermark, synced_at, complete = get_watermark(
+            connection, network_id, product_type
+        )
+    if time.time() - synced_at < event_store_min_sync_interval:
+        return complete
+
+    starting_after = max(watermark or "", since or retention_start())
+    pages = iter_network_events(
+        dashboard,
+        network_id,
+        product_type,
+        t0=starting_after,
+        direction="next",
+        max_pages=event_store_max_pages,
+    )
+    while True:
+        try:
+            events = next(pages)
+        except StopIteration as stop:
+            complete = not stop.value
+            break
+        store_events(organization_id, network_id, product_type, events)
+        # Next sync starts after the newest stored event
+        starting_after = max(
+            starting_after, max(event["occurredAt"] for event in events)
+        )
+        set_watermark(network_id, product_type, starting_after, complete=False)
+
+    set_watermark(network_id, product_type, starting_after, complete)
+    return complete
+
+
+def set_watermark(network_id, product_type, watermark, complete=True):
+    with write_lock, connect() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO sync_watermarks VALUES (?, ?, ?, ?, ?)",
+            (network_id, product_type, watermark, time.time(), complete),
+        )
+
+
+def store_events(organization_id, network_id, product_type, events):
+    rows = [
+        (
+            organization_id,
+            network_id,
+            product_type,
+            event["occurredAt"],
+            event["type"],
+            event.get("category"),
+            event.get("description") or "",
+            event.get("deviceSerial") or "",
+            event.get("clientId") or event.get("clientMac") or "",
+        )
+        for event in events
+    ]
+    if not rows:
+        return
+    with write_lock, connect() as connection:
+        connection.executemany(
+            "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+
+def prune(organization_id):
+    """Drop the events older than the retention period."""
+    with write_lock, connect() as connection:
+        connection.execute(
+            "DELETE FROM events WHERE organization_id = ? AND occurred_at < ?",
+            (organization_id, retention_start()),
+        )
+
+
+def count_events(organization_id, product_type, event_types, since=None):
+    """Count stored events by description and by (network, description)."""
+    if not event_types:
+        return [], []
+    where = (
+        "organization_id = ? AND product_type = ? AND occurred_at >= ?"
+        f" AND type IN ({', '.join('?' * len(event_types))})"
+    )
+    params = [organization_id, product_type, since or retention_start()]
+    params += list(event_types)
+
+    with connect() as connection:
+        by_description = connection.execute(
+            f"SELECT description, COUNT(*) FROM events WHERE {where}"
+            " GROUP BY description ORDER BY COUNT(*) DESC",
+            params,
+        ).fetchall()
+        by_network = connection.execute(
+            f"SELECT network_id, description, COUNT(*) FROM events WHERE {where}"
+            " GROUP BY network_id, description",
+            params,
+        ).fetchall()
+    return by_description, by_network
@@ -0,0 +1,193 @@
+import argparse
+import csv
+import gzip
+import json
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from utils import set_headless
+from metrics import set_page
+from config import dashboard, ORGANIZATION_ID
+from reports import reports, report_columns, default_product_type
+from reports import default_api_usage_days
+from multi_org import discover_organizations, get_organization_ids, iter_multi_org
+
+
+def flatten(row, prefix=""):
+    """Flatten nested dicts into dotted keys, e.g. general.serial"""
+    flat = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (list, tuple)):
+            flat[name] = json.dumps(value, default=str)
+        else:
+            flat[name] = value
+    return flat
+
+
+def write_jsonl(rows, out):
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, default=str) + "\n")
+        count += 1
+    return count
+
+
+def write_csv(rows, out, columns=None):
+    """Write rows as CSV, with columns as header when given.
+
+    Rows are written as they arrive when the columns are known, a row with
+    another column raises ValueError. Otherwise the header has the columns
+    of every row (e.g. a response code seen on one day only): flattened rows
+    are spooled to a temporary file while collecting the columns, and
+    written once the last row arrived, one at a time.
+    """
+    if columns is not None:
+        writer = csv.DictWriter(out, fieldnames=columns)
+        writer.writeheader()
+        count = 0
+        for row in rows:
+            writer.writerow(flatten(row))
+            count += 1
+        return count
+
+    # Columns in the order they are first seen
+    fieldnames = {}
+    count = 0
+    with tempfile.TemporaryFile("w+") as spool:
+        for row in rows:
+            row = flatten(row)
+            fieldnames.update(dict.fromkeys(row))
+            spool.write(json.dumps(row, default=str) + "\n")
+            count += 1
+        if not count:
+            return 0
+        spool.seek(0)
+        writer = csv.DictWriter(out, fieldnames=list(fieldnames))
+        writer.writeheader()
+        for line in spool:
+            writer.writerow(json.loads(line))
+    return count
+
+
+writers = {"jsonl": write_jsonl, "csv": write_csv}
+
+
+def open_output(path, compress):
+    if path == "-":
+        if compress:
+            return gzip.open(sys.stdout.buffer, "wt", newline="")
+        return sys.stdout
+    if compress:
+        return gzip.open(path, "wt", newline="")
+    return open(path, "w", newline="")
+
+
+def run_export(args, out):
+    """Stream the rows of a report to out, returns the number of rows"""
+    if args.orgs:
+        rows = multi_org_rows(args)
+    else:
+        rows = reports[args.report](ORGANIZATION_ID, args)
+    if args.format == "csv":
+        return write_csv(rows, out, export_columns(args))
+    return writers[args.format](rows, out)
+
+
+def export_columns(args):
+    """CSV columns of the exported report, None when they vary with the data."""
+    columns = report_columns.get(args.report)
+    if columns is not None and args.orgs:
+        return ["organizationId", *columns]
+    return columns
+
+
+def multi_org_rows(args):
+    """Rows of every organization of --orgs, in the order they complete."""
+    if args.orgs == "all":
+        organization_ids = discover_organizations(dashboard)
+    elif args.orgs == "configured":
+        organization_ids = get_organization_ids(dashboard)
+    else:
+        organization_ids = [org for org in args.orgs.split(",") if org]
+    for organization_id, rows, error in iter_multi_org(
+        args.report, organization_ids, args, args.org_workers
+    ):
+        if error is not None:
+            print(f"Organization {organization_id}: {error}", file=sys.stderr)
+            continue
+        yield from rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export a report without the web UI, one row at a time."
+    )
+    parser.add_argument("report", choices=sorted(reports))
+    buffered = ", ".join(sorted(set(reports) - set(report_columns)))
+    parser.add_argument(
+        "--format",
+        choices=sorted(writers),
+        default="jsonl",
+        help=f"csv of the {buffered} reports is buffered and written once the "
+        "report completes, as their columns vary with the data",
+    )
+    parser.add_argument(
+        "--output", "-o", default="-", help="output file, - for stdout (default)"
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="gzip the output, implied by an output file ending in .gz",
+    )
+    parser.add_argument(
+        "--product-type",
+        default=default_product_type,
+        help="product type of the logs report",
+    )
+    parser.add_argument(
+        "--event-types",
+        type=lambda value: [typ for typ in value.split(",") if typ],
+        help="comma separated event types of the logs report",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=default_api_usage_days,
+        help="days covered by the api_usage report",
+    )
+    parser.add_argument(
+        "--orgs",
+        nargs="?",
+        const="configured",
+        help="run for several organizations: a comma separated list, all, or "
+        "without value MK_CSM_ORGS (all when unset); rows get an organizationId",
+    )
+    parser.add_argument(
+        "--org-workers", type=int, help="organizations exported in parallel"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    set_headless()
+    set_page(f"export {args.report}")
+    compress = args.gzip or args.output.endswith(".gz")
+    out = open_output(args.output, compress)
+    try:
+        # Keep the reports' own prints out of the exported data
+        with redirect_stdout(sys.stderr):
+            count = run_export(args, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    print(f"Exported {count} {args.report} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
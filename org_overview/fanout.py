@@ -0,0 +1,124 @@
+import asyncio
+import time
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from config import max_concurrent_requests
+
+# Monotonic time after which the call running in this context is abandoned
+deadline = ContextVar("deadline", default=None)
+
+
+def check_deadline():
+    """Raise TimeoutError once the deadline of the current call has passed.
+
+    Long running calls check it between API requests, so a call abandoned by
+    iter_concurrent_settled stops instead of making requests in the background.
+    """
+    if deadline.get() is not None and time.monotonic() > deadline.get():
+        raise TimeoutError("Deadline exceeded")
+
+
+def run_concurrent(func, items, max_workers=None):
+    """Call func(item) for every item using a bounded thread pool.
+
+    Results are returned in the same order as items. An exception raised by
+    func is re-raised to the caller, as it would be with a plain loop.
+    """
+    items = list(items)
+    if not items:
+        return []
+    workers = min(max_workers or max_concurrent_requests, len(items))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [submit(executor, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
+async def gather_concurrent(func, items, max_workers=None):
+    """Await func(item) for every item, at most max_workers at a time.
+
+    The asyncio counterpart of run_concurrent: results are returned in the
+    same order as items, and an exception is re-raised to the caller.
+    """
+    semaphore = asyncio.Semaphore(max_workers or max_concurrent_requests)
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+def submit(executor, func, *args):
+    """Submit func to executor, running in a copy of the caller's context.
+
+    Context variables (headless mode, the page the API metrics are counted
+    for, ...) are then visible in the worker threads.
+    """
+    return executor.submit(copy_context().run, func, *args)
+
+
+def iter_concurrent(func, items, max_workers=None):
+    """Call func(item) for every item using a bounded thread pool.
+
+    Yields (item, result) pairs as soon as each call completes, so results
+    can be consumed and dropped without waiting for the slowest call.
+    """
+    items = list(items)
+    if not items:
+        return
+    workers = min(max_workers or max_concurrent_requests, len(items))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {submit(executor, func, item): item for item in items}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def iter_concurrent_settled(func, items, timeout=None, max_workers=None):
+    """Call func(item) for every item using a bounded thread pool.
+
+    Yields (item, result, error) as soon as each call completes. Errors are
+    returned instead of raised, and a call running for more than timeout
+    seconds is abandoned and reported with a TimeoutError.
+
+    Python threads cannot be interrupted: an abandoned call keeps its worker
+    until it returns. It stops at its next check_deadline(), i.e. after the
+    API request in flight (bounded by the SDK's request timeout) when it pages
+    with iter_network_events. Calls without checks run to completion.
+    """
+    items = list(items)
+    if not items:
+        return
+    # item index -> monotonic time its call started
+    started = {}
+
+    def run(index):
+        started[index] = time.monotonic()
+        if timeout is not None:
+            deadline.set(started[index] + timeout)
+        return func(items[index])
+
+    workers = min(max_workers or max_concurrent_requests, len(items))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        pending = {submit(executor, run, index): index for index in range(len(items))}
+        while pending:
+            done, _ = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = items[pending.pop(future)]
+                if future.exception() is not None:
+                    yield item, None, future.exception()
+                else:
+                    yield item, future.result(), None
+
+            if timeout is None:
+                continue
+            now = time.monotonic()
+            for future, index in list(pending.items()):
+                if index in started and now - started[index] > timeout:
+                    del pending[future]
+                    yield items[index], None, TimeoutError(
+                        f"No response after {timeout}s"
+                    )
+    finally:
+        # Abandoned calls stop at their next deadline check, queued ones are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,41 +1,56 @@
 from pywebio.input import *  # For input elements like DATE
 from pywebio.output import *  # For output elements like put_text, put_buttons
 from pywebio import start_server, config
-from utils import page_init
+from utils import page_init, loading, run_aio, run_blocking
 from navigation import navigate_to_main
 from collections import Counter, defaultdict
+import meraki
 from config import *
+from cache import get_networks, get_dataset, get_dataset_async, register_dataset
+from fanout import run_concurrent
+from event_store import sync_network, prune, count_events
+from network_events import iter_network_events, iso_hours_ago
 
 page_title = "Logs Overview"
 
 
-def logs_overview(main_func=None):
+async def logs_overview(main_func=None):
     """Render header"""
     if main_func:
         page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
     else:
         page_init(back_to_main_text, page_title)
 
-    productType = select_product_type(dashboard, ORGANIZATION_ID, product_types_logs)
+    productType = await select_product_type(
+        aio_dashboard, ORGANIZATION_ID, product_types_logs
+    )
 
-    selected_events = fetch_log_type(
+    selected_events = await fetch_log_type(
         dashboard, ORGANIZATION_ID, productType, logs_events_selected[productType]
     )
 
-    # Fetch data
-    data = fetch_log_overview(dashboard, ORGANIZATION_ID, productType, selected_events)
+    # Fetch data, the event log sync runs in a worker thread
+    with loading("Fetching data, please wait..."):
+        data = await run_blocking(
+            fetch_log_overview, dashboard, ORGANIZATION_ID, productType, selected_events
+        )
 
     # Display data
+    if data["partial_networks"]:
+        put_warning(
+            "Partial counts, the event log of these networks is still being "
+            f"synced: {', '.join(data['partial_networks'])}"
+        )
     put_datatable(data["org_data"])
     put_datatable(data["net_data"])
 
 
-def select_product_type(dashboard, organization_id, product_types_logs):
+async def select_product_type(aio_dashboard, organization_id, product_types_logs):
     with put_loading():
         put_text("Fetching data, please wait...")
         # Fetch networks and their event types
-        networks = dashboard.organizations.getOrganizationNetworks(
-            organization_id, total_pages="all"
+        networks = await run_aio(
+            get_dataset_async("networks", aio_dashboard, organization_id)
         )
 
         # Initialize a set to store unique product types
@@ -53,49 +68,22 @@ def select_product_type(dashboard, organization_id, product_types_logs):
     options = sorted(list(unique_product_types))
 
     # Display radio button selection
-    selected_product_type = radio(
+    selected_product_type = await radio(
         label="Select a product type:", options=options, required=True
     )
 
     return selected_product_type
 
 
-def fetch_log_type(dashboard, organization_id, productType, logs_events_selected):
+async def fetch_log_type(dashboard, organization_id, productType, logs_events_selected):
     with put_loading():
         put_text("Fetching data, please wait...")
 
-        # Fetch all networks within the specified organization
-        networks = dashboard.organizations.getOrganizationNetworks(
-            organization_id, total_pages="all"
+        # Event types available for the product type (cached for a long time)
+        all_event_types = await run_blocking(
+            get_dataset, "event_types", dashboard, organization_id, productType
         )
 
-        # Initialize a set to store unique event types
-        all_event_types = set()
-
-        # Iterate through each network to gather event types
-        for network in networks:
-            # Check if the specified product type exists in the network's product types
-            if productType not in network["productTypes"]:
-                continue
-
-            print(network["name"], network["productTypes"])
-            print(productType)
-
-            # Fetch event types for the current network
-            event_types = dashboard.networks.getNetworkEvents(
-                network["id"],
-                productType=productType,
-            )
-            print(event_types)
-
-            # Add each event's category, type, and description to the set
-            for event in event_types["events"]:
-                all_event_types.add(
-                    (event["category"], event["type"], event["description"])
-                )
-
-        print(all_event_types)
-
         # Sort the event types by category and then by type
         sorted_event_types = sorted(all_event_types, key=lambda x: (x[0], x[1]))
 
@@ -125,7 +113,7 @@ def fetch_log_type(dashboard, organization_id, productType, logs_events_selected
             )
 
         # Display the input group with markdown and checkboxes
-    selected_values = input_group(
+    selected_values = await input_group(
         "Select Events",
         input_elements
         + [
@@ -147,62 +135,136 @@ def fetch_log_type(dashboard, organization_id, productType, logs_events_selected
     return selected_event_types
 
 
+def fetch_event_types(dashboard, organization_id, productType):
+    """Discover the (category, type, description) event types of a product type."""
+    networks = [
+        network
+        for network in get_networks(dashboard, organization_id)
+        if productType in network["productTypes"]
+    ]
+    if not networks:
+        return frozenset()
+
+    # A single call on the network with the fewest other product types
+    network = min(networks, key=lambda network: len(network["productTypes"]))
+    try:
+        event_types = dashboard.networks.getNetworkEventsEventTypes(network["id"])
+        return frozenset(
+            (event["category"], event["type"], event["description"])
+            for event in event_types
+        )
+    except meraki.APIError:
+        pass
+
+    # Fallback: collect the types of the latest events of every network in parallel
+    responses = run_concurrent(
+        lambda network: dashboard.networks.getNetworkEvents(
+            network["id"], productType=productType
+        ),
+        networks,
+    )
+    return frozenset(
+        (event["category"], event["type"], event["description"])
+        for response in responses
+        for event in response["events"]
+    )
+
+
+register_dataset("event_types", fetch_event_types)
+
+
+def count_network_events(dashboard, network_id, productType, includedEventTypes, since):
+    """Count the events of a network by description and by (networkId, description)."""
+    description_counter = Counter()
+    network_description_counter = Counter()
+    for events in iter_network_events(
+        dashboard,
+        network_id,
+        productType,
+        t0=since,
+        includedEventTypes=includedEventTypes,
+    ):
+        description_counter.update(event["description"] for event in events)
+        network_description_counter.update(
+            (event["networkId"], event["description"]) for event in events
+        )
+    return description_counter, network_description_counter
+
+
 def fetch_log_overview(dashboard, organization_id, productType, includedEventTypes):
-    with put_loading():
-        put_text("Fetching data, please wait...")
+    with loading("Fetching data, please wait..."):
         # Retrieve all networks in the organization
-        networks = dashboard.organizations.getOrganizationNetworks(
-            organization_id, total_pages="all"
-        )
+        networks = get_networks(dashboard, organization_id)
 
         # Create a dictionary to map network ID to network name
         network_id_to_name = {network["id"]: network["name"] for network in networks}
 
-        event_list = []
-        for network in networks:
-            if productType in network["productTypes"]:
-                response = dashboard.networks.getNetworkEvents(
-                    network["id"],
-                    productType=productType,
-                    includedEventTypes=includedEventTypes,
-                )
-
-                for event in response["events"]:
-                    # Creating the filtered dictionary
-                    filtered_event = {
-                        "networkId": event["networkId"],
-                        "type": event["type"],
-                        "description": event["description"],
-                    }
-                    event_list.append(filtered_event)
-
-        # Counting occurrences based on description
-        description_counter = Counter(event["description"] for event in event_list)
-
-        # Counting occurrences based on description and networkId
-        network_description_counter = Counter(
-            (event["networkId"], event["description"]) for event in event_list
-        )
+        product_networks = [
+            network for network in networks if productType in network["productTypes"]
+        ]
+        since = iso_hours_ago(logs_overview_window_hours)
+        partial_networks = []
+
+        if logs_event_store_enabled:
+            # Pull only the events newer than each network's sync watermark
+            complete = run_concurrent(
+                lambda network: sync_network(
+                    dashboard, organization_id, network["id"], productType, since
+                ),
+                product_networks,
+            )
+            partial_networks = [
+                network["name"]
+                for network, network_complete in zip(product_networks, complete)
+                if not network_complete
+            ]
+            prune(organization_id)
+
+            # Count occurrences by description and by networkId and description
+            description_counts, network_description_counts = count_events(
+                organization_id, productType, includedEventTypes, since
+            )
+        else:
+            # Stream the whole window of every network, one page at a time
+            description_counter = Counter()
+            network_description_counter = Counter()
+            for counters in run_concurrent(
+                lambda network: count_network_events(
+                    dashboard, network["id"], productType, includedEventTypes, since
+                ),
+                product_networks,
+            ):
+                description_counter.update(counters[0])
+                network_description_counter.update(counters[1])
+
+            description_counts = description_counter.most_common()
+            network_description_counts = [
+                (network_id, desc, count)
+                for (network_id, desc), count in network_description_counter.items()
+            ]
 
         # Prepare data for the description-based table
         description_data = [
-            {"Description": desc, "Count": count}
-            for desc, count in description_counter.items()
+            {"Description": desc, "Count": count} for desc, count in description_counts
         ]
 
         # Prepare data for the network description-based table with network name
         network_description_data = [
             {
-                "Network ID": net_desc[0],
+                "Network ID": network_id,
                 "Network Name": network_id_to_name.get(
-                    net_desc[0], "Unknown"
+                    network_id, "Unknown"
                 ),  # Retrieve network name
-                "Description": net_desc[1],
+                "Description": desc,
                 "Count": count,
             }
-            for net_desc, count in network_description_counter.items()
+            for network_id, desc, count in network_description_counts
         ]
-    return {"org_data": description_data, "net_data": network_description_data}
+    return {
+        "org_data": description_data,
+        "net_data": network_description_data,
+        "partial_networks": partial_networks,
+    }
 
 
 def main():
@@ -210,7 +272,7 @@ def main():
     # Set configuration for PyWebIO
     config(css_style=css_style)
     # Start the server with the mx_logs_overview function
-    start_server(lambda: logs_overview(), port=8999, debug=True)
+    start_server(logs_overview, port=8999, debug=True)
 
 
 if __name__ == "__main__":
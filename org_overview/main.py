@@ -1,19 +1,39 @@
 from pywebio import start_server, config
-from pywebio.output import put_markdown, clear, put_buttons
+from pywebio.output import put_markdown, clear, put_buttons, toast
 from admin_overview import admin_overview
 from net_overview import net_overview
-from logs_overview import mx_logs_overview
+from logs_overview import logs_overview
 from mx_sec_status import mx_sec_status
 from api_usage import api_usage
 from firmware_status import firmware_status
 from ms_reboot_reason import ms_reboot_reason
+from diagnostics import diagnostics
+from multi_org import multi_org_report
 from config import *
+from cache import invalidate
+from prefetch import start_prefetch
+from metrics import start_metrics_server
 
 # Set configuration for PyWebIO
 config(css_style=css_style)
 
+if profile_enabled:
+    from profiling import install_profiling, profiled
 
-def main():
+    # Time the API, processing, UI and input phases of every page
+    install_profiling()
+    admin_overview = profiled(admin_overview)
+    net_overview = profiled(net_overview)
+    logs_overview = profiled(logs_overview)
+    mx_sec_status = profiled(mx_sec_status)
+    api_usage = profiled(api_usage)
+    firmware_status = profiled(firmware_status)
+    ms_reboot_reason = profiled(ms_reboot_reason)
+    multi_org_report = profiled(multi_org_report)
+    diagnostics = profiled(diagnostics)
+
+
+async def main():
     """Main menu function for the application."""
     clear()
     put_markdown("# Meraki Dashboard")
@@ -26,7 +46,20 @@ def main():
     put_buttons(["API Usage"], onclick=[lambda: api_usage(main)])
     put_buttons(["Firmware status"], onclick=[lambda: firmware_status(main)])
     put_buttons(["MS Reboot Reason"], onclick=[lambda: ms_reboot_reason(main)])
+    put_buttons(["Multi-org reports"], onclick=[lambda: multi_org_report(main)])
+    put_buttons(["Diagnostics"], onclick=[lambda: diagnostics(main)])
+    put_buttons(["Refresh cached data"], onclick=[refresh_cached_data])
+
+
+def refresh_cached_data():
+    """Drop the shared datasets cache so the next page view re-crawls the API."""
+    invalidate()
+    toast("Cached data cleared")
 
 
 if __name__ == "__main__":
-    start_server(lambda: main(), port=8999, debug=True)
+    if prefetch_enabled:
+        start_prefetch(dashboard, ORGANIZATION_ID)
+    if metrics_port:
+        start_metrics_server(metrics_port)
+    start_server(main, port=8999, debug=True)
@@ -0,0 +1,285 @@
+import threading
+import time
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from api_hooks import (
+    wrap_session_request,
+    wrap_async_session_request,
+    add_response_hook,
+)
+
+# Upper bounds of the request latency histogram, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Page that triggered the requests of the current context, set for the
+# background work of a page by page_init (see utils.run_blocking)
+current_page = ContextVar("current_page", default="background")
+# (operation, [attempts]) of the request being sent in the current context
+_current_request = ContextVar("current_request", default=None)
+
+
+def set_page(page):
+    """Tag the API requests of the current context with page"""
+    return current_page.set(page)
+
+
+class EndpointMetrics:
+    __slots__ = (
+        "calls",
+        "requests",
+        "attempts",
+        "retries",
+        "throttled",
+        "errors",
+        "bytes",
+        "seconds",
+        "max_seconds",
+        "buckets",
+        "codes",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.throttled = 0
+        self.errors = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # Non cumulative counts, one per LATENCY_BUCKETS bound plus +Inf
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        # HTTP status -> responses, retried attempts included
+        self.codes = {}
+
+
+# Called as listener(operation, start, end) after every request, see profiling
+request_listeners = []
+
+_lock = threading.Lock()
+# (page, operation) -> EndpointMetrics
+_metrics = {}
+
+
+def _endpoint(page, operation):
+    metrics = _metrics.get((page, operation))
+    if metrics is None:
+        metrics = _metrics[(page, operation)] = EndpointMetrics()
+    return metrics
+
+
+def record_request(operation, seconds, size, first_page=True, error=False, retries=0):
+    """Record one request (one page of a call) of the current page."""
+    with _lock:
+        metrics = _endpoint(current_page.get(), operation)
+        metrics.calls += first_page
+        metrics.requests += 1
+        metrics.retries += retries
+        metrics.errors += error
+        metrics.bytes += size
+        metrics.seconds += seconds
+        metrics.max_seconds = max(metrics.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                metrics.buckets[i] += 1
+                break
+        else:
+            metrics.buckets[-1] += 1
+
+
+def record_response(operation, status):
+    """Record one HTTP response, every retry of a request included."""
+    with _lock:
+        metrics = _endpoint(current_page.get(), operation)
+        metrics.attempts += 1
+        metrics.throttled += status == 429
+        metrics.codes[status] = metrics.codes.get(status, 0) + 1
+
+
+def observe(operation, send, *args, first_page=True, **kwargs):
+    """Call send(*args, **kwargs) and record its latency, size and retries."""
+    attempts = [0]
+    token = _current_request.set((operation, attempts))
+    start = time.perf_counter()
+    response = None
+    try:
+        response = send(*args, **kwargs)
+        return response
+    finally:
+        _current_request.reset(token)
+        _observed(operation, start, response, first_page, attempts[0])
+
+
+async def observe_async(operation, send, *args, first_page=True, **kwargs):
+    """Same as observe, for a coroutine function send."""
+    attempts = [0]
+    token = _current_request.set((operation, attempts))
+    start = time.perf_counter()
+    response = None
+    try:
+        response = await send(*args, **kwargs)
+        return response
+    finally:
+        _current_request.reset(token)
+        _observed(operation, start, response, first_page, attempts[0])
+
+
+def _observed(operation, start, response, first_page, attempts):
+    end = time.perf_counter()
+    content = getattr(response, "content", None)
+    record_request(
+        operation,
+        end - start,
+        len(content) if content else 0,
+        first_page,
+        error=response is None,
+        retries=max(attempts - 1, 0),
+    )
+    for listener in request_listeners:
+        listener(operation, start, end)
+
+
+def _on_response(response):
+    current = _current_request.get()
+    if current is None:
+        return
+    operation, attempts = current
+    attempts[0] += 1
+    record_response(operation, response.status_code)
+
+
+def install_metrics(dashboard):
+    """Record every request of dashboard, install it below the rate limiter."""
+
+    def instrumented(send, metadata, method, url, **kwargs):
+        return observe(
+            metadata.get("operation", method),
+            send,
+            metadata,
+            method,
+            url,
+            first_page=metadata.get("page", 1) == 1,
+            **kwargs,
+        )
+
+    wrap_session_request(dashboard, instrumented)
+    add_response_hook(dashboard, _on_response)
+
+
+def install_async_metrics(aio_dashboard):
+    """Same as install_metrics, for a meraki.aio AsyncDashboardAPI."""
+
+    async def instrumented(send, metadata, method, url, **kwargs):
+        return await observe_async(
+            metadata.get("operation", method),
+            send,
+            metadata,
+            method,
+            url,
+            first_page=metadata.get("page", 1) == 1,
+            **kwargs,
+        )
+
+    wrap_async_session_request(aio_dashboard, instrumented)
+    add_response_hook(aio_dashboard, _on_response)
+
+
+def metrics_rows():
+    """Return the counters of every page and endpoint, for display."""
+    with _lock:
+        items = sorted(_metrics.items())
+        rows = []
+        for (page, operation), metrics in items:
+            rows.append(
+                {
+                    "Page": page,
+                    "Endpoint": operation,
+                    "Calls": metrics.calls,
+                    "Pages": metrics.requests,
+                    "Retries": metrics.retries,
+                    "429s": metrics.throttled,
+                    "Errors": metrics.errors,
+                    "MB received": round(metrics.bytes / 2**20, 2),
+                    "Average (ms)": round(
+                        1000 * metrics.seconds / max(metrics.requests, 1)
+                    ),
+                    "Max (ms)": round(1000 * metrics.max_seconds),
+                }
+            )
+    return rows
+
+
+def _labels(**labels):
+    escaped = {
+        name: str(value).replace("\\", "\\\\").replace('"', '\\"')
+        for name, value in labels.items()
+    }
+    return ",".join(f'{name}="{value}"' for name, value in escaped.items())
+
+
+def prometheus_text():
+    """Return the metrics in the Prometheus text exposition format."""
+    counters = [
+        ("calls", "API calls, first pages only"),
+        ("requests", "API requests, one per page"),
+        ("retries", "Retried API requests"),
+        ("throttled", "429 responses"),
+        ("errors", "Failed API requests"),
+        ("bytes", "Response bytes received"),
+    ]
+    lines = []
+    with _lock:
+        items = sorted(_metrics.items())
+        for name, help_text in counters:
+            metric = f"meraki_api_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (page, operation), metrics in items:
+                labels = _labels(page=page, operation=operation)
+                lines.append(f"{metric}{{{labels}}} {getattr(metrics, name)}")
+
+        lines.append("# HELP meraki_api_responses_total HTTP responses by status")
+        lines.append("# TYPE meraki_api_responses_total counter")
+        for (page, operation), metrics in items:
+            for code, count in sorted(metrics.codes.items()):
+                labels = _labels(page=page, operation=operation, code=code)
+                lines.append(f"meraki_api_responses_total{{{labels}}} {count}")
+
+        metric = "meraki_api_request_duration_seconds"
+        lines.append(f"# HELP {metric} API request latency, retries included")
+        lines.append(f"# TYPE {metric} histogram")
+        for (page, operation), metrics in items:
+            labels = _labels(page=page, operation=operation)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), metrics.buckets):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum{{{labels}}} {metrics.seconds}")
+            lines.append(f"{metric}_count{{{labels}}} {metrics.requests}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics for Prometheus from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    return server
@@ -7,25 +7,26 @@ from config import *
 page_title = "Page title"
 
 
-def display_function(main_func=None):
+async def display_function(main_func=None):
     """Render header"""
     if main_func:
         page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
     else:
         page_init(back_to_main_text, page_title)
 
-    # Fetch data
-    data = fetch_function(dashboard, ORGANIZATION_ID)
+    # Fetch data in a worker thread, meraki.aio coroutines are awaited with run_aio
+    with loading("Fetching data, please wait..."):
+        data = await run_blocking(fetch_function, dashboard, ORGANIZATION_ID)
 
     # Display data
     put_datatable()
 
 
 def fetch_function(dashboard, organization_id):
-    with put_loading():
-        put_text("Fetching data, please wait...")
+    with loading("Fetching data, please wait..."):
+        data = []
 
-    return
+    return data
 
 
 def main():
@@ -33,7 +34,7 @@ def main():
     # Set configuration for PyWebIO
     config(css_style=css_style)
     # Start the server with the mx_sec_status function
-    start_server(lambda: display_function(), port=8999, debug=True)
+    start_server(display_function, port=8999, debug=True)
 
 
 if __name__ == "__main__":
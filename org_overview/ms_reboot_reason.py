@@ -1,69 +1,113 @@
 from pywebio.output import *
 from pywebio import start_server
-from utils import page_init
+from utils import page_init, loading, run_blocking, iter_blocking
 from navigation import navigate_to_main
 from config import *
+from cache import get_networks
+from fanout import iter_concurrent_settled
+from boot_history import sync_boot_events, boot_events, boot_counts
 
 page_title = "Ms reboot reason"
 
-includedEventTypes = ["boot"]
+table_id = "ms_reboot_reason"
+warnings_scope = "ms_reboot_reason_warnings"
+column_order = ["Time", "Name", "Serial", "Description", "Category", "Reason"]
 
 
-def ms_reboot_reason(main_func=None):
+async def ms_reboot_reason(main_func=None):
     """Render header and fetch/display data"""
     if main_func:
         page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
     else:
         page_init(back_to_main_text, page_title)
 
-    # Fetch data
-    data = fetch_function(dashboard, ORGANIZATION_ID)
-
-    # Display data
-    put_datatable(data)
+    # Rows are appended as each switch network completes. put_loading removes
+    # its scope on exit, warnings get their own scope outside it
+    put_datatable([], column_order=column_order, instance_id=table_id)
+    put_scope(warnings_scope)
+    with loading("Fetching data, please wait..."):
+        async for net, rows, error in iter_blocking(
+            iter_boot_events(dashboard, ORGANIZATION_ID)
+        ):
+            if error is not None:
+                # Show what is already stored for the network
+                put_warning(
+                    f"{net['name']}: new boot events unavailable ({error})",
+                    scope=warnings_scope,
+                )
+                rows = await run_blocking(boot_event_rows, ORGANIZATION_ID, net["id"])
+            if rows:
+                datatable_insert(table_id, rows)
+
+    # Display reboot counts over the whole stored history
+    per_switch, per_reason = await run_blocking(boot_counts, ORGANIZATION_ID)
+    put_text("Reboots per switch")
+    put_datatable(
+        [
+            {"Serial": serial, "Name": name, "Reboots": count, "Last boot": last}
+            for serial, name, count, last in per_switch
+        ],
+        height=300,
+    )
+    put_text("Reboots per reason")
+    put_datatable(
+        [{"Reason": reason, "Reboots": count} for reason, count in per_reason],
+        height=300,
+    )
 
 
 def fetch_function(dashboard, organization_id):
-    with put_loading():
-        put_text("Fetching data, please wait...")
+    with loading("Fetching data, please wait..."):
         all_event_data = []
-        # Fetch all networks for the organization
-        networks = dashboard.organizations.getOrganizationNetworks(
-            organization_id, total_pages="all"
-        )
+        for net, rows, error in iter_boot_events(dashboard, organization_id):
+            if error is not None:
+                print(f"{net['name']}: new boot events unavailable ({error})")
+                rows = boot_event_rows(organization_id, net["id"])
+            all_event_data.extend(rows)
 
-        for net in networks:
-            if "switch" in net["productTypes"]:
-                # Fetch network events for switches
-                events = dashboard.networks.getNetworkEvents(
-                    net["id"],
-                    total_pages=10,
-                    productType="switch",
-                    includedEventTypes=includedEventTypes,
-                )
+    return all_event_data
 
-                for event in events.get("events", []):
-                    # Extract the reason from eventData if it exists
-                    reason = event.get("eventData", {}).get("reason", "N/A")
-
-                    # Add each event as a dictionary without nested structures
-                    event_dict = {
-                        "Time": event.get("occurredAt", "N/A"),
-                        "Name": event.get("deviceName", "N/A"),
-                        "Serial": event.get("deviceSerial", "N/A"),
-                        "Description": event.get("description", "N/A"),
-                        "Category": event.get("category", "N/A"),
-                        "Reason": reason,
-                    }
-                    all_event_data.append(event_dict)
 
-    return all_event_data
+def iter_boot_events(dashboard, organization_id):
+    """Yield (network, rows, error) for every switch network as it completes."""
+    # Fetch all networks for the organization
+    networks = get_networks(dashboard, organization_id)
+    switch_networks = [net for net in networks if "switch" in net["productTypes"]]
+
+    yield from iter_concurrent_settled(
+        lambda net: fetch_network_boot_events(dashboard, organization_id, net),
+        switch_networks,
+        timeout=network_fetch_timeout,
+    )
+
+
+def fetch_network_boot_events(dashboard, organization_id, net):
+    # Fetch only the boots newer than the network's stored history
+    sync_boot_events(dashboard, organization_id, net["id"])
+    return boot_event_rows(organization_id, net["id"])
+
+
+def boot_event_rows(organization_id, network_id):
+    # Add each event as a dictionary without nested structures
+    return [
+        {
+            "Time": occurred_at,
+            "Name": name,
+            "Serial": serial,
+            "Description": description,
+            "Category": category,
+            "Reason": reason,
+        }
+        for occurred_at, name, serial, description, category, reason in boot_events(
+            organization_id, network_id
+        )
+    ]
 
 
 def main():
     """Main function for standalone execution"""
     # Start the server with the ms_reboot_reason function
-    start_server(lambda: ms_reboot_reason(), port=8999, debug=True)
+    start_server(ms_reboot_reason, port=8999, debug=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+from pywebio.output import *
+from pywebio.input import select
+from pywebio import start_server
+from utils import page_init, loading, set_headless, run_blocking, iter_blocking
+from navigation import navigate_to_main
+from config import *
+from fanout import iter_concurrent_settled
+from rate_limit import set_organization
+from reports import reports, report_options
+
+page_title = "Multi-Organization Reports"
+
+table_id = "multi_org"
+
+# Reports offered on the page, the others need options of the export CLI
+page_reports = ["networks", "admins", "firmware", "mx_security", "ms_reboots"]
+
+
+async def multi_org_report(main_func=None):
+    """Render header"""
+    if main_func:
+        page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
+    else:
+        page_init(back_to_main_text, page_title)
+
+    report = await select("Report", options=page_reports)
+    organization_ids = await run_blocking(get_organization_ids, dashboard)
+    put_text(f"{report} across {len(organization_ids)} organizations")
+
+    # Rows are appended as each organization completes. put_loading removes
+    # its scope on exit, the table and warnings get their own scope outside it
+    row_count = 0
+    put_scope(table_id)
+    with loading("Fetching data, please wait..."):
+        async for organization_id, rows, error in iter_blocking(
+            iter_multi_org(report, organization_ids, report_options())
+        ):
+            if error is not None:
+                put_warning(f"Organization {organization_id}: {error}", scope=table_id)
+                continue
+            if not rows:
+                continue
+            if not row_count:
+                put_datatable(rows, instance_id=table_id, scope=table_id)
+            else:
+                datatable_insert(table_id, rows)
+            row_count += len(rows)
+
+    if not row_count:
+        put_text("No data available to display.")
+
+
+def discover_organizations(dashboard):
+    """IDs of every organization the API key can access."""
+    return [org["id"] for org in dashboard.organizations.getOrganizations()]
+
+
+def get_organization_ids(dashboard):
+    """Configured organizations, or every accessible one when none are."""
+    return organization_ids or discover_organizations(dashboard)
+
+
+def run_org_report(report, organization_id, options):
+    """Rows of a report for one organization, with an organizationId column."""
+    # Worker threads have no PyWebIO session to show a spinner in
+    set_headless()
+    # Requests of this organization wait for its own rate limit bucket
+    set_organization(organization_id)
+    return [
+        {"organizationId": organization_id, **row}
+        for row in reports[report](organization_id, options)
+    ]
+
+
+def iter_multi_org(report, organization_ids, options, max_workers=None):
+    """Yield (organization_id, rows, error) as each organization completes."""
+    yield from iter_concurrent_settled(
+        lambda organization_id: run_org_report(report, organization_id, options),
+        organization_ids,
+        max_workers=max_workers or org_max_workers,
+    )
+
+
+def main():
+    """Main function for standalone execution"""
+    # Start the server with the multi_org_report function
+    start_server(multi_org_report, port=8999, debug=True)
+
+
+if __name__ == "__main__":
+    main()
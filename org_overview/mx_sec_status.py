@@ -1,16 +1,21 @@
 from pywebio import start_server, config
 from pywebio.output import *
 from pywebio import start_server
-from utils import page_init
+from utils import page_init, loading, run_aio
 from navigation import navigate_to_main
 from config import *
-import json
-import requests
+from snapshot import OrgSnapshot
+from fanout import gather_concurrent
+from aio_bridge import run_sync
+from singleflight import flights
+import asyncio
 
 page_title = "MX Security Overview"
 
+snapshot_datasets = ["networks", "appliance_uplink_statuses"]
 
-def mx_sec_status(main_func=None):
+
+async def mx_sec_status(main_func=None):
     """Render header"""
     if main_func:
         page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
@@ -18,7 +23,8 @@ def mx_sec_status(main_func=None):
         page_init(back_to_main_text, page_title)
 
     # Fetch data
-    data = fetch_mx_sec_status(dashboard, ORGANIZATION_ID)
+    with loading("Fetching data, please wait..."):
+        data = await run_aio(fetch_mx_sec_status_async(aio_dashboard, ORGANIZATION_ID))
 
     # Display data
     put_datatable(
@@ -27,7 +33,7 @@ def mx_sec_status(main_func=None):
             (
                 "View Firewall Rules",
                 lambda row_id: firewall_rules(
-                    dashboard,
+                    aio_dashboard,
                     data[row_id]["general"]["networkId"],
                     data[row_id]["general"]["serial"],
                 ),
@@ -37,171 +43,197 @@ def mx_sec_status(main_func=None):
 
 
 def fetch_mx_sec_status(dashboard, organization_id):
-    with put_loading():
-        put_text("Fetching data, please wait...")
-
-        # Fetch networks and uplinks
-        networks = dashboard.organizations.getOrganizationNetworks(
-            organization_id, total_pages="all"
-        )
-        org_uplinks = dashboard.appliance.getOrganizationApplianceUplinkStatuses(
-            organization_id, total_pages="all"
-        )
-        xdr_status = get_org_xdr_status()
-        print(xdr_status)
-        data = []
-        for net in networks:
-            if "appliance" not in net["productTypes"]:
-                continue
+    # Same fetch as the page, the API calls run in threads
+    with loading("Fetching data, please wait..."):
+        return run_sync(fetch_mx_sec_status_async, dashboard, organization_id)
 
-            network_id = net["id"]
-            network_name = net["name"]  # Retrieve network name
 
-            # Use a list comprehension to get all uplinks for the network_id
-            mx_uplinks_list = [x for x in org_uplinks if x["networkId"] == network_id]
+async def fetch_mx_sec_status_async(aio_dashboard, organization_id):
+    # Networks, uplink statuses and XDR status are fetched concurrently
+    snapshot, xdr_status = await asyncio.gather(
+        OrgSnapshot.build_async(aio_dashboard, organization_id, snapshot_datasets),
+        get_org_xdr_status_async(aio_dashboard, organization_id),
+    )
+    data, security_rows = uplink_rows(snapshot)
 
-            # If no uplinks found or if all models are CPSC-HUB, skip
-            if not mx_uplinks_list or all(
-                uplink.get("model") == "CPSC-HUB" for uplink in mx_uplinks_list
-            ):
-                continue
+    # Fetch security settings of the non-spare appliances concurrently
+    network_ids = security_network_ids(security_rows)
+    results = await gather_concurrent(
+        lambda network_id: get_network_security_async(aio_dashboard, network_id),
+        network_ids,
+    )
+    add_security(security_rows, dict(zip(network_ids, results)))
+    return data
 
-            # Process each uplink
-            for mx_uplinks in mx_uplinks_list:
-                # Compile data for each uplink in the network
-                row = {
-                    "general": {
-                        "networkId": mx_uplinks["networkId"],
-                        "name": network_name,  # Include network name
-                        "serial": mx_uplinks["serial"],
-                        "model": mx_uplinks["model"],
-                        "lastReportedAt": mx_uplinks["lastReportedAt"],
-                        "firewallRulesCount": "-",
-                    },
-                    "highAvailability": mx_uplinks["highAvailability"],
-                    "uplinks": {},
-                    "security": {
-                        "IDS": "unavailable",
-                        "AMP": "unavailable",
-                    },
-                    "URL Filtering": {
-                        "Allowed URLs": "-",
-                        "Blocked URLs": "-",
-                        "Blocked Categories": "-",
-                    },
+
+def uplink_rows(snapshot):
+    """Return the rows of every appliance uplink, and those needing security settings."""
+    data = []
+    # Rows waiting for the per-network security settings
+    security_rows = []
+    for net in snapshot.networks_by_product_type.get("appliance", []):
+        network_id = net["id"]
+        network_name = net["name"]  # Retrieve network name
+
+        # Get all uplinks for the network_id
+        mx_uplinks_list = snapshot.uplinks_by_network.get(network_id, [])
+
+        # If no uplinks found or if all models are CPSC-HUB, skip
+        if not mx_uplinks_list or all(
+            uplink.get("model") == "CPSC-HUB" for uplink in mx_uplinks_list
+        ):
+            continue
+
+        # Process each uplink
+        for mx_uplinks in mx_uplinks_list:
+            # Compile data for each uplink in the network
+            row = {
+                "general": {
+                    "networkId": mx_uplinks["networkId"],
+                    "name": network_name,  # Include network name
+                    "serial": mx_uplinks["serial"],
+                    "model": mx_uplinks["model"],
+                    "lastReportedAt": mx_uplinks["lastReportedAt"],
+                    "firewallRulesCount": "-",
+                },
+                "highAvailability": mx_uplinks["highAvailability"],
+                "uplinks": {},
+                "security": {
+                    "IDS": "unavailable",
+                    "AMP": "unavailable",
+                },
+                "URL Filtering": {
+                    "Allowed URLs": "-",
+                    "Blocked URLs": "-",
+                    "Blocked Categories": "-",
+                },
+            }
+
+            # Add uplinks information
+            for uplink in mx_uplinks.get("uplinks", []):
+                interface = uplink["interface"]
+                status = uplink["status"]
+
+                if status == "active" or status == "ready":
+                    status_with_emoji = f"\U0001f7e2 {status}"
+                else:
+                    status_with_emoji = f"\U0001f534 {status}"
+
+                row["uplinks"][interface] = status_with_emoji
+
+            # Check if highAvailability role is "spare"
+            if mx_uplinks["highAvailability"]["role"] == "spare":
+                row["security"] = {
+                    "IDS": "spare",
+                    "AMP": "spare",
+                }
+                row["URL Filtering"] = {
+                    "Allowed URLs": "spare",
+                    "Blocked URLs": "spare",
+                    "Blocked Categories": "spare",
                 }
+                data.append(row)
+                continue
 
-                # Add uplinks information
-                for uplink in mx_uplinks.get("uplinks", []):
-                    interface = uplink["interface"]
-                    status = uplink["status"]
-
-                    if status == "active" or status == "ready":
-                        status_with_emoji = f"\U0001f7e2 {status}"
-                    else:
-                        status_with_emoji = f"\U0001f534 {status}"
-
-                    row["uplinks"][interface] = status_with_emoji
-
-                # Check if highAvailability role is "spare"
-                if mx_uplinks["highAvailability"]["role"] == "spare":
-                    row["security"] = {
-                        "IDS": "spare",
-                        "AMP": "spare",
-                    }
-                    row["URL Filtering"] = {
-                        "Allowed URLs": "spare",
-                        "Blocked URLs": "spare",
-                        "Blocked Categories": "spare",
-                    }
-                    data.append(row)
-                    continue
-
-                # Retrieve firewall rules count
-                fw_rules = (
-                    dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(
-                        network_id
-                    )
-                )
-                fw_rules_count = len(fw_rules["rules"])
-                row["general"]["firewallRulesCount"] = fw_rules_count
-
-                security_fetch_error = False
-                try:
-                    # Retrieve IDS and AMP data
-                    ids = dashboard.appliance.getNetworkApplianceSecurityIntrusion(
-                        network_id
-                    )
-                    amp = dashboard.appliance.getNetworkApplianceSecurityMalware(
-                        network_id
-                    )
-                    # Retrieve content filtering data
-                    content_filtering = (
-                        dashboard.appliance.getNetworkApplianceContentFiltering(
-                            network_id
-                        )
-                    )
-                    allowed_url_count = len(
-                        content_filtering.get("allowedUrlPatterns", [])
-                    )
-                    blocked_url_count = len(
-                        content_filtering.get("blockedUrlPatterns", [])
-                    )
-                    blocked_categories_count = len(
-                        content_filtering.get("blockedUrlCategories", [])
-                    )
-
-                except:
-                    security_fetch_error = True
-
-                # Modify based on security_fetch_error being False
-                if not security_fetch_error:
-                    # Update "security" section
-                    row["security"] = {
-                        "IDS": (
-                            (
-                                ids["mode"]
-                                if ids["mode"] == "disabled"
-                                else f"{ids['mode']} - {ids['idsRulesets']}"
-                            ),
-                        ),
-                        "AMP": amp["mode"],
-                    }
-                    # Update "URL Filtering" section
-                    row["URL Filtering"] = {
-                        "Allowed URLs": allowed_url_count,
-                        "Blocked URLs": blocked_url_count,
-                        "Blocked Categories": blocked_categories_count,
-                    }
+            security_rows.append(row)
+            data.append(row)
+    return data, security_rows
 
-                data.append(row)
-    return data
+
+def security_network_ids(security_rows):
+    return list(dict.fromkeys(row["general"]["networkId"] for row in security_rows))
 
 
-def get_org_xdr_status():
-    url = (
-        "https://api.meraki.com/api/v1/organizations/"
-        + ORGANIZATION_ID
-        + "/integrations/xdr/networks"
+def add_security(security_rows, security_by_network):
+    for row in security_rows:
+        security = security_by_network[row["general"]["networkId"]]
+        row["general"]["firewallRulesCount"] = security["firewallRulesCount"]
+
+        # Modify based on security_fetch_error being False
+        if not security["security_fetch_error"]:
+            row["security"] = dict(security["security"])
+            row["URL Filtering"] = dict(security["URL Filtering"])
+
+
+async def get_network_security_async(aio_dashboard, network_id):
+    """Security settings of a network, sessions fetching it at once share the calls."""
+    security, _ = await flights.do_async(
+        ("network_security", network_id),
+        fetch_network_security_async,
+        aio_dashboard,
+        network_id,
+    )
+    return security
+
+
+async def fetch_network_security_async(aio_dashboard, network_id):
+    """Fetch firewall, IDS, AMP and content filtering settings of a network.
+
+    The four calls run concurrently.
+    """
+    appliance = aio_dashboard.appliance
+    fw_rules, ids, amp, content_filtering = await asyncio.gather(
+        appliance.getNetworkApplianceFirewallL3FirewallRules(network_id),
+        appliance.getNetworkApplianceSecurityIntrusion(network_id),
+        appliance.getNetworkApplianceSecurityMalware(network_id),
+        appliance.getNetworkApplianceContentFiltering(network_id),
+        return_exceptions=True,
     )
+    # The firewall rules are required, the other settings are optional
+    if isinstance(fw_rules, BaseException):
+        raise fw_rules
+    if any(
+        isinstance(result, BaseException) for result in (ids, amp, content_filtering)
+    ):
+        return network_security(fw_rules)
+    return network_security(fw_rules, ids, amp, content_filtering)
+
+
+def network_security(fw_rules, ids=None, amp=None, content_filtering=None):
+    """Summarize the security settings of a network; without ids, amp and
+    content_filtering, they could not be fetched."""
+    result = {
+        "firewallRulesCount": len(fw_rules["rules"]),
+        "security_fetch_error": False,
+    }
+    if ids is None:
+        result["security_fetch_error"] = True
+        return result
 
-    payload = None
-    authB = "Bearer " + API_KEY
+    allowed_url_count = len(content_filtering.get("allowedUrlPatterns", []))
+    blocked_url_count = len(content_filtering.get("blockedUrlPatterns", []))
+    blocked_categories_count = len(content_filtering.get("blockedUrlCategories", []))
 
-    headers = {
-        "Authorization": authB,
-        "Accept": "application/json",
+    # Update "security" section
+    result["security"] = {
+        "IDS": (
+            (
+                ids["mode"]
+                if ids["mode"] == "disabled"
+                else f"{ids['mode']} - {ids['idsRulesets']}"
+            ),
+        ),
+        "AMP": amp["mode"],
     }
+    # Update "URL Filtering" section
+    result["URL Filtering"] = {
+        "Allowed URLs": allowed_url_count,
+        "Blocked URLs": blocked_url_count,
+        "Blocked Categories": blocked_categories_count,
+    }
+    return result
 
-    response = requests.request("GET", url, headers=headers, data=payload)
 
-    print(response.text.encode("utf8"))
-    return json.loads(response.text.encode("utf8"))
+async def get_org_xdr_status_async(aio_dashboard, organization_id):
+    return await aio_dashboard.organizations.getOrganizationIntegrationsXdrNetworks(
+        organization_id
+    )
 
 
-def firewall_rules(dashboard, network_id, serial):
+async def firewall_rules(aio_dashboard, network_id, serial):
     """Fetch and display firewall rules for a specific network."""
-    data = fetch_firewall_rules(dashboard, network_id)
+    with put_loading():
+        data = await run_aio(fetch_firewall_rules_async(aio_dashboard, network_id))
     put_scope(network_id)
     close_btn = put_buttons(["Close"], onclick=[lambda: remove(network_id)])
     put_row(
@@ -211,11 +243,10 @@ def firewall_rules(dashboard, network_id, serial):
     put_datatable(data, height=300, scope=network_id)
 
 
-def fetch_firewall_rules(dashboard, network_id):
-    with put_loading():
-        fw_rules = dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(
-            network_id
-        )
+async def fetch_firewall_rules_async(aio_dashboard, network_id):
+    fw_rules = await aio_dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(
+        network_id
+    )
     return fw_rules["rules"]
 
 
@@ -224,7 +255,7 @@ def main():
     # Set configuration for PyWebIO
     config(css_style=css_style)
     # Start the server with the mx_sec_status function
-    start_server(lambda: mx_sec_status(), port=8999, debug=True)
+    start_server(mx_sec_status, port=8999, debug=True)
 
 
 if __name__ == "__main__":
@@ -1,3 +1,3 @@
-def navigate_to_main(main_func):
+async def navigate_to_main(main_func):
     """A function to navigate back to the main menu."""
-    main_func()
+    await main_func()
@@ -1,13 +1,17 @@
 from pywebio.output import *
 from pywebio import start_server
-from utils import page_init
+from utils import page_init, loading, run_aio
 from navigation import navigate_to_main
 from config import *
+from cache import get_networks, get_dataset_async
 
 page_title = "Networks Overview"
 
+# Network fields shown, all of them when empty
+keys_to_include = ["id", "name", "timeZone", "tags"]
 
-def net_overview(main_func=None):
+
+async def net_overview(main_func=None):
     """Render header"""
     if main_func:
         page_init(back_to_main_text, page_title, lambda: navigate_to_main(main_func))
@@ -15,35 +19,41 @@ def net_overview(main_func=None):
         page_init(back_to_main_text, page_title)
 
     # Fetch data
-    data = fetch_net_overview(dashboard, ORGANIZATION_ID)
+    with loading():
+        data = await run_aio(fetch_net_overview_async(aio_dashboard, ORGANIZATION_ID))
 
     # Display data
     put_datatable(data)
 
 
 def fetch_net_overview(dashboard, organization_id):
-    keys_to_include = ["id", "name", "timeZone", "tags"]
-    with put_loading():  # Fetch networks from the organization
-        networks = dashboard.organizations.getOrganizationNetworks(
-            organization_id, total_pages="all"
-        )
-
-        # Filter networks based on keys_to_include
-        filtered_networks = (
-            [
-                {key: network[key] for key in keys_to_include if key in network}
-                for network in networks
-            ]
-            if keys_to_include
-            else networks
-        )
+    with loading():  # Fetch networks from the organization
+        networks = get_networks(dashboard, organization_id)
+        filtered_networks = network_rows(networks)
     return filtered_networks
 
 
+async def fetch_net_overview_async(aio_dashboard, organization_id):
+    networks = await get_dataset_async("networks", aio_dashboard, organization_id)
+    return network_rows(networks)
+
+
+def network_rows(networks):
+    # Filter networks based on keys_to_include
+    return (
+        [
+            {key: network[key] for key in keys_to_include if key in network}
+            for network in networks
+        ]
+        if keys_to_include
+        else networks
+    )
+
+
 def main():
     """Main function for standalone execution"""
     # Start the server with the net_overview function
-    start_server(lambda: net_overview(), port=8999, debug=True)
+    start_server(net_overview, port=8999, debug=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+from fanout import check_deadline
+
+
+def iso_hours_ago(hours):
+    """ISO timestamp of hours before now, as accepted by the event log API."""
+    return (datetime.now(timezone.utc) - timedelta(hours=hours)).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def iter_network_events(
+    dashboard,
+    network_id,
+    productType,
+    t0=None,
+    t1=None,
+    direction="prev",
+    per_page=1000,
+    max_pages=None,
+    **kwargs,
+):
+    """Yield the event log of a network page by page, between t0 and t1.
+
+    Pages go back in time from t1 by default, or forward from t0 with
+    direction="next". Only one page of events is held at a time. Raises
+    TimeoutError before the next page once the call's deadline has passed.
+
+    Returns True (the StopIteration value) when max_pages stopped the paging
+    before the end of the window.
+    """
+    cursor = t1 if direction == "prev" else t0
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        check_deadline()
+        params = dict(kwargs, productType=productType, perPage=per_page)
+        if cursor and direction == "prev":
+            params["endingBefore"] = cursor
+        elif cursor:
+            params["startingAfter"] = cursor
+
+        response = dashboard.networks.getNetworkEvents(network_id, **params)
+        pages += 1
+
+        # Drop the events outside of the window (ISO strings sort by time)
+        events = [
+            event
+            for event in response["events"]
+            if (not t0 or event["occurredAt"][:19] >= t0[:19])
+            and (not t1 or event["occurredAt"][:19] <= t1[:19])
+        ]
+        if events:
+            yield events
+
+        if direction == "prev":
+            next_cursor = response.get("pageStartAt")
+            done = not next_cursor or (t0 and next_cursor[:19] <= t0[:19])
+        else:
+            next_cursor = response.get("pageEndAt")
+            done = not next_cursor or (t1 and next_cursor[:19] >= t1[:19])
+        # Events were dropped: the page already crossed the window boundary
+        crossed = len(events) < len(response["events"])
+        if not response["events"] or done or crossed or next_cursor == cursor:
+            return
+        cursor = next_cursor
+    return True
@@ -0,0 +1,43 @@
+import threading
+import time
+from cache import refresh
+from config import cache_ttl_seconds, prefetch_datasets, prefetch_ttl_ratio
+
+_stop = threading.Event()
+
+
+def start_prefetch(dashboard, organization_id, datasets=None):
+    """Start a daemon thread keeping the cached datasets warm."""
+    _stop.clear()
+    thread = threading.Thread(
+        target=prefetch_loop,
+        args=(dashboard, organization_id, datasets or prefetch_datasets),
+        name="prefetch",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def stop_prefetch():
+    _stop.set()
+
+
+def prefetch_loop(dashboard, organization_id, datasets):
+    # dataset -> monotonic time of the next refresh, all due at start
+    next_refresh = {dataset: 0.0 for dataset in datasets}
+
+    while not _stop.is_set():
+        now = time.monotonic()
+        for dataset, due in next_refresh.items():
+            if due > now:
+                continue
+            try:
+                refresh(dataset, dashboard, organization_id)
+            except Exception as e:
+                print(f"Prefetch of {dataset} failed: {e}")
+            next_refresh[dataset] = (
+                time.monotonic() + cache_ttl_seconds[dataset] * prefetch_ttl_ratio
+            )
+
+        _stop.wait(max(0.0, min(next_refresh.values()) - time.monotonic()))
@@ -0,0 +1,226 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+import pywebio.input
+import pywebio.output
+import pywebio.session
+from pywebio.output import put_collapse, put_table
+from metrics import request_listeners
+from utils import set_session_context, session_context
+from config import profile_log_path, profile_log_max_bytes, profile_log_backups
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Profile of the page running in the current context, set for the background
+# work of a session by profiled (see utils.run_blocking)
+current_profile = ContextVar("current_profile", default=None)
+# Set while a timed UI or input call runs, nested calls are not timed again
+_in_phase = ContextVar("in_phase", default=False)
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+class PageProfile:
+    """Time intervals of a page view: API requests, UI pushes and input waits."""
+
+    def __init__(self, page):
+        self.page = page
+        self.start = time.perf_counter()
+        self.end = None
+        self.requests = 0
+        self._lock = threading.Lock()
+        # phase -> [(start, end)], API requests may come from worker threads
+        self.intervals = {"api": [], "ui": [], "input": []}
+
+    def add(self, phase, start, end):
+        with self._lock:
+            self.intervals[phase].append((start, end))
+            self.requests += phase == "api"
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def phases(self):
+        """Seconds per phase; overlapping API requests are counted once."""
+        with self._lock:
+            intervals = {phase: list(spans) for phase, spans in self.intervals.items()}
+        total = (self.end or time.perf_counter()) - self.start
+        busy = covered([span for spans in intervals.values() for span in spans])
+        return {
+            "total": total,
+            "api": covered(intervals["api"]),
+            "processing": max(total - busy, 0.0),
+            "ui": covered(intervals["ui"]),
+            "input": covered(intervals["input"]),
+        }
+
+
+def covered(spans):
+    """Length of the union of (start, end) spans."""
+    length = 0.0
+    current_start = current_end = None
+    for start, end in sorted(spans):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                length += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        length += current_end - current_start
+    return length
+
+
+def _on_request(operation, start, end):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add("api", start, end)
+
+
+def get_profile():
+    return current_profile.get() or session_context().get(current_profile)
+
+
+def timed(func, phase):
+    """Wrap a PyWebIO function so its calls count for phase."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = get_profile()
+        if profile is None or _in_phase.get():
+            return func(*args, **kwargs)
+        token = _in_phase.set(True)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                # Input functions of coroutine sessions wait once awaited
+                return timed_await(result, profile, phase, start)
+            return result
+        finally:
+            if not inspect.isawaitable(result):
+                profile.add(phase, start, time.perf_counter())
+            _in_phase.reset(token)
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+async def timed_await(awaitable, profile, phase, start):
+    try:
+        return await awaitable
+    finally:
+        profile.add(phase, start, time.perf_counter())
+
+
+def pywebio_functions():
+    """PyWebIO function -> phase of the calls that push UI or wait for input."""
+    functions = {}
+    for module, names, phase in (
+        (pywebio.output, pywebio.output.__all__, "ui"),
+        (pywebio.session, ["run_js", "eval_js", "download"], "ui"),
+        (pywebio.input, pywebio.input.__all__, "input"),
+    ):
+        for name in names:
+            value = getattr(module, name)
+            if inspect.isfunction(value):
+                functions[value] = phase
+    return functions
+
+
+def install_profiling():
+    """Time the PyWebIO calls of every loaded module of the application.
+
+    The pages import PyWebIO functions by name, so the names are replaced
+    in each module rather than in PyWebIO itself.
+    """
+    if _on_request not in request_listeners:
+        request_listeners.append(_on_request)
+    functions = pywebio_functions()
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None) or ""
+        if os.path.dirname(os.path.abspath(path)) != APP_DIR:
+            continue
+        for name, value in list(vars(module).items()):
+            try:
+                phase = functions.get(value)
+            except TypeError:
+                continue
+            if phase:
+                setattr(module, name, timed(value, phase))
+
+
+def profiled(page_func):
+    """Time a page function, then show its timing panel and log the sample.
+
+    The page function is also replaced in the module defining it.
+    """
+
+    @functools.wraps(page_func)
+    async def wrapper(*args, **kwargs):
+        profile = PageProfile(page_func.__name__)
+        set_session_context(current_profile, profile)
+        try:
+            return await page_func(*args, **kwargs)
+        finally:
+            profile.finish()
+            set_session_context(current_profile, None)
+            phases = profile.phases()
+            put_timing_panel(phases, profile.requests)
+            log_sample(profile.page, phases, profile.requests)
+
+    # Calls of the page from its own module (e.g. a reload button) are timed too
+    setattr(sys.modules[page_func.__module__], page_func.__name__, wrapper)
+    return wrapper
+
+
+def put_timing_panel(phases, requests):
+    rows = [
+        [label, f"{phases[phase]:.3f}", f"{100 * phases[phase] / phases['total']:.0f}%"]
+        for phase, label in (
+            ("api", "API wait"),
+            ("processing", "Local processing"),
+            ("ui", "UI push"),
+            ("input", "User input"),
+            ("total", "Total"),
+        )
+        if phases["total"]
+    ]
+    put_collapse(
+        f"Timing: {phases['total']:.2f}s, {requests} API requests",
+        [put_table(rows, header=["Phase", "Seconds", "Share"])],
+    )
+
+
+def get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            os.makedirs(os.path.dirname(profile_log_path), exist_ok=True)
+            handler = RotatingFileHandler(
+                profile_log_path,
+                maxBytes=profile_log_max_bytes,
+                backupCount=profile_log_backups,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _logger = logging.getLogger("org_overview.profile")
+            _logger.setLevel(logging.INFO)
+            _logger.propagate = False
+            _logger.addHandler(handler)
+        return _logger
+
+
+def log_sample(page, phases, requests):
+    """Append one JSON line per page view to the rotating profile log."""
+    sample = {"ts": time.time(), "page": page, "requests": requests}
+    sample.update({phase: round(seconds, 4) for phase, seconds in phases.items()})
+    get_logger().info(json.dumps(sample))
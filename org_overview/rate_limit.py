@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from api_hooks import wrap_session_request, wrap_async_session_request
+
+# Dashboard API budget per organization
+DEFAULT_RATE_PER_SECOND = 10
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers queue for a token instead of hitting 429s."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        # queue name -> {"calls", "waited", "max_wait"}
+        self._queues = {}
+
+    def reserve(self):
+        """Take a token and return how many seconds the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def record(self, queue, waited):
+        with self._lock:
+            stats = self._queues.setdefault(
+                queue, {"calls": 0, "waited": 0.0, "max_wait": 0.0}
+            )
+            stats["calls"] += 1
+            stats["waited"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+
+    def acquire(self, queue="default"):
+        """Block until a token is available; return the time spent waiting."""
+        waited = self.reserve()
+        if waited:
+            time.sleep(waited)
+        self.record(queue, waited)
+        return waited
+
+    async def acquire_async(self, queue="default"):
+        """Same as acquire, but waits without blocking the event loop."""
+        waited = self.reserve()
+        if waited:
+            await asyncio.sleep(waited)
+        self.record(queue, waited)
+        return waited
+
+    def stats(self):
+        with self._lock:
+            return {queue: dict(stats) for queue, stats in self._queues.items()}
+
+
+# Organization the requests of the current context are made for, when a
+# dashboard serves several of them (multi-organization mode)
+current_organization = ContextVar("current_organization", default=None)
+
+_lock = threading.Lock()
+# organization_id -> TokenBucket, shared by every session and thread
+_buckets = {}
+
+
+def get_bucket(organization_id, rate=DEFAULT_RATE_PER_SECOND):
+    with _lock:
+        if organization_id not in _buckets:
+            _buckets[organization_id] = TokenBucket(rate)
+        return _buckets[organization_id]
+
+
+def set_organization(organization_id):
+    """Charge the requests of the current context to organization_id"""
+    return current_organization.set(organization_id)
+
+
+def install_rate_limiter(dashboard, organization_id, rate=DEFAULT_RATE_PER_SECOND):
+    """Make every request of dashboard wait for a token of the organization bucket.
+
+    Requests made for another organization (see set_organization) wait for
+    that organization's bucket instead.
+    """
+    get_bucket(organization_id, rate)
+
+    def limited(send, metadata, method, url, **kwargs):
+        bucket = get_bucket(current_organization.get() or organization_id, rate)
+        bucket.acquire(metadata.get("operation", method))
+        return send(metadata, method, url, **kwargs)
+
+    wrap_session_request(dashboard, limited)
+
+
+def install_async_rate_limiter(
+    aio_dashboard, organization_id, rate=DEFAULT_RATE_PER_SECOND
+):
+    """Same as install_rate_limiter, for a meraki.aio AsyncDashboardAPI.
+
+    Both share the organization buckets, so the budget holds across the
+    threaded and the asyncio code paths.
+    """
+    get_bucket(organization_id, rate)
+
+    async def limited(send, metadata, method, url, **kwargs):
+        bucket = get_bucket(current_organization.get() or organization_id, rate)
+        await bucket.acquire_async(metadata.get("operation", method))
+        return await send(metadata, method, url, **kwargs)
+
+    wrap_async_session_request(aio_dashboard, limited)
+
+
+def rate_limit_stats():
+    """Return the wait time of every queue of every organization bucket."""
+    with _lock:
+        buckets = list(_buckets.items())
+    rows = []
+    for organization_id, bucket in buckets:
+        for queue, stats in sorted(bucket.stats().items()):
+            rows.append(
+                {
+                    "Organization": organization_id,
+                    "Queue": queue,
+                    "Calls": stats["calls"],
+                    "Total wait (s)": round(stats["waited"], 2),
+                    "Average wait (s)": round(stats["waited"] / stats["calls"], 3),
+                    "Max wait (s)": round(stats["max_wait"], 2),
+                }
+            )
+    return rows
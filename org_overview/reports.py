@@ -0,0 +1,123 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from argparse import Namespace
+from config import dashboard, dashboard_iterator, logs_events_selected
+from net_overview import fetch_net_overview, keys_to_include
+from admin_overview import fetch_admin_overview
+from firmware_status import iter_firmware_status
+from mx_sec_status import fetch_mx_sec_status
+from ms_reboot_reason import iter_boot_events, boot_event_rows
+from ms_reboot_reason import column_order as ms_reboots_columns
+from event_correlation import iter_function as iter_alert_correlation
+from event_correlation import column_order as alert_correlation_columns
+from logs_overview import fetch_log_overview
+from api_usage import fetch_api_usage
+
+# Options of the reports that take any, see report_options
+default_product_type = "appliance"
+default_api_usage_days = 30
+
+
+def report_networks(organization_id, args):
+    return fetch_net_overview(dashboard, organization_id)
+
+
+def report_admins(organization_id, args):
+    return fetch_admin_overview(dashboard, organization_id)
+
+
+def report_firmware(organization_id, args):
+    return iter_firmware_status(dashboard, organization_id)
+
+
+def report_mx_security(organization_id, args):
+    return fetch_mx_sec_status(dashboard, organization_id)
+
+
+def report_ms_reboots(organization_id, args):
+    for net, rows, error in iter_boot_events(dashboard, organization_id):
+        if error is not None:
+            # Fall back to what is already stored for the network
+            print(
+                f"{net['name']}: new boot events unavailable ({error})", file=sys.stderr
+            )
+            rows = boot_event_rows(organization_id, net["id"])
+        yield from rows
+
+
+def report_alert_correlation(organization_id, args):
+    return iter_alert_correlation(dashboard, organization_id)
+
+
+def report_logs(organization_id, args):
+    event_types = args.event_types
+    if event_types is None:
+        event_types = logs_events_selected.get(args.product_type, [])
+    data = fetch_log_overview(
+        dashboard, organization_id, args.product_type, event_types
+    )
+    if data["partial_networks"]:
+        print(
+            "Partial counts, the event log of these networks is still being "
+            f"synced: {', '.join(data['partial_networks'])}"
+        )
+    return data["net_data"]
+
+
+def report_api_usage(organization_id, args):
+    """One row per UTC day with its request counts."""
+    t1 = int(datetime.now(timezone.utc).timestamp())
+    t0 = int((datetime.now(timezone.utc) - timedelta(days=args.days)).timestamp())
+    api_usage = fetch_api_usage(dashboard_iterator, organization_id, t0, t1)
+    for day in api_usage.dates():
+        rollup = api_usage.days[day]
+        yield {
+            "date": day,
+            "requests": sum(rollup.codes.values()),
+            "responseCodes": dict(rollup.codes),
+            "methods": dict(rollup.methods),
+        }
+
+
+# Report name -> function(organization_id, options) returning an iterable of rows,
+# shared by the export CLI and the multi-organization runner
+reports = {
+    "networks": report_networks,
+    "admins": report_admins,
+    "firmware": report_firmware,
+    "mx_security": report_mx_security,
+    "ms_reboots": report_ms_reboots,
+    "alert_correlation": report_alert_correlation,
+    "logs": report_logs,
+    "api_usage": report_api_usage,
+}
+
+# Columns of the reports whose rows all have the same (flattened) keys, their
+# CSV export is written as the rows arrive. The others vary with the data,
+# e.g. one column per uplink or response code.
+report_columns = {
+    "networks": keys_to_include,
+    "firmware": [
+        "general.deviceName",
+        "general.serial",
+        "general.model",
+        "general.networkName",
+        "Status.deviceStatus",
+        "Firmware.configuredFirmware",
+        "Firmware.firmwareStatus",
+    ],
+    "ms_reboots": ms_reboots_columns,
+    "alert_correlation": alert_correlation_columns,
+    "logs": ["Network ID", "Network Name", "Description", "Count"],
+}
+
+
+def report_options(**options):
+    """Options of the report functions, defaults for the ones not given."""
+    defaults = {
+        "product_type": default_product_type,
+        "event_types": None,
+        "days": default_api_usage_days,
+    }
+    defaults.update(options)
+    return Namespace(**defaults)
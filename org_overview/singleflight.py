@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single call.
+
+    The first caller of a key runs the call, callers arriving while it is in
+    flight wait for its result (or exception) instead of calling again.
+    Threads and coroutines share the calls in flight, so a page's coroutine
+    may wait for a crawl started by a worker thread and the other way round.
+    The call runs in the context of its first caller, e.g. its API requests
+    are counted for that caller's page.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> concurrent.futures.Future of the call in flight
+        self._calls = {}
+
+    def _join(self, key):
+        """Return the future of the call of key, and whether the caller runs it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _settle(self, key, future, value=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def _settle_task(self, key, future, task):
+        if task.cancelled():
+            self._settle(key, future, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._settle(key, future, error=task.exception())
+        else:
+            self._settle(key, future, task.result())
+
+    def do(self, key, func, *args):
+        """Call func(*args) unless a call of key is in flight.
+
+        Returns (value, shared), shared is True when the value came from the
+        call of another caller.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), True
+        try:
+            value = func(*args)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, value)
+        return value, False
+
+    async def do_async(self, key, coro_func, *args):
+        """Same as do, awaiting coro_func(*args)."""
+        future, leader = self._join(key)
+        if leader:
+            # The call runs as its own task: when the first caller is
+            # cancelled (its session closed), the others still get a result
+            task = asyncio.ensure_future(coro_func(*args))
+            task.add_done_callback(lambda task: self._settle_task(key, future, task))
+        value = await asyncio.shield(asyncio.wrap_future(future))
+        return value, not leader
+
+
+# Calls of the data layer shared by every session and thread
+flights = SingleFlight()
@@ -0,0 +1,85 @@
+import asyncio
+from cache import get_dataset_async
+from aio_bridge import run_sync
+
+
+def index_by(items, key):
+    """Map key -> first item carrying that key."""
+    index = {}
+    for item in items:
+        index.setdefault(item.get(key), item)
+    return index
+
+
+def group_by(items, key):
+    """Map key -> list of items carrying that key, in original order."""
+    index = {}
+    for item in items:
+        index.setdefault(item.get(key), []).append(item)
+    return index
+
+
+class OrgSnapshot:
+    """Organization datasets fetched once per page view and indexed for O(1) joins.
+
+    Indexes return the shared cached objects, which must not be modified.
+    """
+
+    datasets = (
+        "networks",
+        "devices",
+        "devices_availabilities",
+        "appliance_uplink_statuses",
+    )
+
+    def __init__(
+        self,
+        networks=(),
+        devices=(),
+        devices_availabilities=(),
+        appliance_uplink_statuses=(),
+    ):
+        self.networks = networks
+        self.devices = devices
+        self.devices_availabilities = devices_availabilities
+        self.appliance_uplink_statuses = appliance_uplink_statuses
+
+        # Networks
+        self.networks_by_id = index_by(networks, "id")
+        self.networks_by_product_type = {}
+        for network in networks:
+            for product_type in network.get("productTypes", []):
+                self.networks_by_product_type.setdefault(product_type, []).append(
+                    network
+                )
+
+        # Devices
+        self.devices_by_serial = index_by(devices, "serial")
+        self.devices_by_network = group_by(devices, "networkId")
+        self.devices_by_product_type = group_by(devices, "productType")
+
+        # Availabilities and uplinks
+        self.availability_by_serial = index_by(devices_availabilities, "serial")
+        self.uplinks_by_network = group_by(appliance_uplink_statuses, "networkId")
+        self.uplinks_by_serial = index_by(appliance_uplink_statuses, "serial")
+
+    @classmethod
+    def build(cls, dashboard, organization_id, datasets=None):
+        """Fetch the requested datasets (all by default) through the shared cache."""
+        return run_sync(cls.build_async, dashboard, organization_id, datasets)
+
+    @classmethod
+    async def build_async(cls, aio_dashboard, organization_id, datasets=None):
+        """Same as build, fetching the datasets concurrently through meraki.aio."""
+        datasets = list(datasets or cls.datasets)
+        values = await asyncio.gather(
+            *(
+                get_dataset_async(dataset, aio_dashboard, organization_id)
+                for dataset in datasets
+            )
+        )
+        return cls(**dict(zip(datasets, values)))
+
+    def network_name(self, network_id, default="Unknown"):
+        network = self.networks_by_id.get(network_id)
+        return network["name"] if network else default
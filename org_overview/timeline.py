@@ -0,0 +1,30 @@
+import heapq
+from itertools import islice
+
+
+def time_key(timestamp):
+    """Sort key of an ISO timestamp of the API, e.g. 2024-05-01T10:00:00.123Z.
+
+    Sources differ in sub-second digits and zone suffix (all UTC), so they
+    compare on their first 19 characters, down to the second.
+    """
+    return timestamp[:19]
+
+
+def merge_timeline(*streams, key=lambda row: time_key(row["Time"])):
+    """Lazily merge row streams that are each already sorted by time_key.
+
+    Only the head row of every stream is held at a time, so the merged
+    timeline can be rendered or exported while it is produced.
+    """
+    return heapq.merge(*streams, key=key)
+
+
+def batched(rows, size):
+    """Group a row stream into lists of at most size rows."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
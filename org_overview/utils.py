@@ -1,4 +1,105 @@
-from pywebio.output import clear, put_buttons, put_markdown
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from pywebio.output import clear, put_buttons, put_markdown, put_loading, put_text
+from pywebio.session import local, run_asyncio_coroutine
+from pywebio.exceptions import SessionException
+from metrics import current_page
+from config import page_max_workers
+
+# Set when running outside a PyWebIO session (e.g. the export CLI)
+headless = ContextVar("headless", default=False)
+
+# Blocking fetches of every session share these threads, and keep the
+# event loop's default executor free for its own use (e.g. DNS lookups)
+page_executor = ThreadPoolExecutor(
+    max_workers=page_max_workers, thread_name_prefix="page"
+)
+
+
+def set_headless(value=True):
+    """Toggle headless mode for the current context, returns the reset token"""
+    return headless.set(value)
+
+
+def set_session_context(var, value):
+    """Set a context variable for the background work of the current session.
+
+    Coroutine sessions share the event loop thread, so values such as the
+    current page are kept in the session and set again by run_blocking and
+    run_aio in the thread or task doing the work.
+    """
+    if local.context is None:
+        local.context = {}
+    local.context[var] = value
+
+
+def session_context():
+    """Context variables of the current session, empty outside a session"""
+    try:
+        return dict(local.context or {})
+    except SessionException:
+        return {}
+
+
+def _run_in_context(context, func, args, kwargs):
+    """Set the session context and headless mode, then call func"""
+    for var, value in context.items():
+        var.set(value)
+    # The page shows its own spinner, there is no session in worker threads
+    set_headless()
+    return func(*args, **kwargs)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking fetch in a page worker thread, keeping the event loop free.
+
+    At most page_max_workers fetches run at a time across all sessions, the
+    others wait for a free worker.
+    """
+    context = session_context()
+
+    async def run():
+        # The variables are set in a copy of the context: the worker threads
+        # are shared by every session and must not keep them
+        return await asyncio.get_running_loop().run_in_executor(
+            page_executor,
+            copy_context().run,
+            _run_in_context,
+            context,
+            func,
+            args,
+            kwargs,
+        )
+
+    return await run_asyncio_coroutine(run())
+
+
+async def iter_blocking(iterable):
+    """Iterate a blocking generator from a page, one item per worker thread call"""
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        item = await run_blocking(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+async def run_aio(coro):
+    """Await a coroutine of the meraki.aio data layer from a page.
+
+    It runs as an asyncio task, as httpx requires, with the session context.
+    """
+    context = session_context()
+
+    async def run():
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+
+    return await run_asyncio_coroutine(run())
 
 
 def page_init(
@@ -6,7 +107,21 @@ def page_init(
     title,
     target=None,
 ):
+    # API requests made from now on are counted for this page
+    set_session_context(current_page, title)
     clear()
     if target is not None:
         put_buttons([text], onclick=[target])
     put_markdown(f"## {title}")
+
+
+@contextmanager
+def loading(text=None):
+    """Show a loading spinner while fetching, a no-op in headless mode"""
+    if headless.get():
+        yield
+        return
+    with put_loading():
+        if text:
+            put_text(text)
+        yield
@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# config.py reads these when first imported: no real API key, organization
+# or metrics endpoint is needed, and local storage goes to a temporary dir
+os.environ.setdefault("MK_CSM_KEY", "test-api-key")
+os.environ.setdefault("MK_CSM_ORG", "1")
+os.environ.setdefault("MK_BASE_URL", "http://127.0.0.1:9/api/v1")
+os.environ.setdefault("MK_METRICS_PORT", "0")
+os.environ.setdefault("MK_DATA_DIR", tempfile.mkdtemp(prefix="org_overview_tests_"))
+
+# The application modules import each other as top-level modules
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "org_overview")
+)
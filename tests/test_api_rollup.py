@@ -0,0 +1,137 @@
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import api_rollup
+import api_usage
+from api_columns import ApiRequestColumns, columns_available
+from api_rollup import ApiUsageAggregator, DayRollup, load_rollup, save_rollup
+
+entries = [
+    {
+        "ts": "2024-05-01T09:15:00.000Z",
+        "responseCode": 200,
+        "method": "GET",
+        "adminId": "A_1",
+        "path": "/organizations",
+    },
+    {
+        "ts": "2024-05-01T09:45:00.000Z",
+        "responseCode": 429,
+        "method": "GET",
+        "adminId": "A_2",
+        "path": "/organizations",
+    },
+    {
+        "ts": "2024-05-01T17:00:00.000Z",
+        "responseCode": 201,
+        "method": "POST",
+        "adminId": "A_1",
+        "path": "/networks",
+    },
+    {
+        "ts": "2024-05-02T00:00:01.000Z",
+        "responseCode": 200,
+        "method": "GET",
+        "adminId": "A_1",
+        "path": "/devices",
+    },
+]
+
+
+def rollup_fields(rollup):
+    return {field: getattr(rollup, field) for field in DayRollup.__slots__}
+
+
+def test_the_aggregator_counts_per_day_and_hour():
+    days = ApiUsageAggregator().update(iter(entries)).days
+
+    assert sorted(days) == ["2024-05-01", "2024-05-02"]
+    day = days["2024-05-01"]
+    assert day.codes == Counter({200: 1, 429: 1, 201: 1})
+    assert day.methods == Counter({"GET": 2, "POST": 1})
+    assert day.admins == {"A_1": Counter({200: 1, 201: 1}), "A_2": Counter({429: 1})}
+    assert day.hour_codes[(9, 200)] == 1
+    assert day.hour_methods == Counter({(9, "GET"): 2, (17, "POST"): 1})
+
+
+def test_merging_shards_of_a_day_equals_a_single_pass():
+    first = ApiUsageAggregator().update(entries[:2]).days["2024-05-01"]
+    second = ApiUsageAggregator().update(entries[2:3]).days["2024-05-01"]
+    whole = ApiUsageAggregator().update(entries[:3]).days["2024-05-01"]
+
+    assert rollup_fields(first.merge(second)) == rollup_fields(whole)
+
+
+def test_rollups_survive_a_json_roundtrip():
+    rollup = ApiUsageAggregator().update(entries).days["2024-05-01"]
+    restored = DayRollup.from_dict(json.loads(json.dumps(rollup.to_dict())))
+    assert rollup_fields(restored) == rollup_fields(rollup)
+
+
+def test_stored_rollups(monkeypatch, tmp_path):
+    monkeypatch.setattr(api_rollup, "api_rollup_dir", str(tmp_path))
+    rollup = ApiUsageAggregator().update(entries).days["2024-05-02"]
+
+    assert load_rollup("1", "2024-05-02") is None
+    save_rollup("1", "2024-05-02", rollup)
+    assert rollup_fields(load_rollup("1", "2024-05-02")) == rollup_fields(rollup)
+    assert load_rollup("2", "2024-05-02") is None
+
+
+def test_rollups_of_another_version_are_ignored(monkeypatch, tmp_path):
+    monkeypatch.setattr(api_rollup, "api_rollup_dir", str(tmp_path))
+    save_rollup("1", "2024-05-01", DayRollup())
+    path = api_rollup.rollup_path("1", "2024-05-01")
+    with open(path) as f:
+        data = json.load(f)
+    data["version"] = api_rollup.ROLLUP_VERSION - 1
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+    assert load_rollup("1", "2024-05-01") is None
+
+
+@pytest.mark.skipif(not columns_available(), reason="numpy is not installed")
+def test_the_columnar_backend_matches_the_aggregator():
+    expected = ApiUsageAggregator().update(entries).days
+    days = ApiRequestColumns().extend(iter(entries)).to_aggregator().days
+
+    assert sorted(days) == sorted(expected)
+    for day, rollup in days.items():
+        assert rollup_fields(rollup) == rollup_fields(expected[day])
+
+
+class Organizations:
+    """getOrganizationApiRequests of a DashboardAPI over a fixed request log."""
+
+    def __init__(self, requests):
+        self.requests = requests
+        self.calls = 0
+
+    def getOrganizationApiRequests(self, organization_id, t0, t1, total_pages=1):
+        self.calls += 1
+        start = datetime.fromtimestamp(t0, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        end = datetime.fromtimestamp(t1, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        return [entry for entry in self.requests if start <= entry["ts"] <= end]
+
+
+def test_stored_days_without_requests_are_not_charted(monkeypatch, tmp_path):
+    monkeypatch.setattr(api_rollup, "api_rollup_dir", str(tmp_path))
+    t0 = int(datetime(2024, 4, 30, tzinfo=timezone.utc).timestamp())
+    t1 = int(datetime(2024, 5, 2, 12, tzinfo=timezone.utc).timestamp())
+    dashboard = SimpleNamespace(organizations=Organizations(entries))
+
+    first = api_usage.fetch_api_usage(dashboard, "1", t0, t1)
+    calls = dashboard.organizations.calls
+    repeat = api_usage.fetch_api_usage(dashboard, "1", t0, t1)
+
+    assert list(first.days) == ["2024-05-01", "2024-05-02"]
+    assert list(repeat.days) == list(first.days)
+    # Closed days, with or without requests, are read from their rollup
+    assert dashboard.organizations.calls == calls
+    for day, rollup in repeat.days.items():
+        assert rollup_fields(rollup) == rollup_fields(first.days[day])
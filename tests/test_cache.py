@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+
+
+class Organizations:
+    """getOrganizationNetworks of a DashboardAPI, counting its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def getOrganizationNetworks(self, organization_id, total_pages=1):
+        self.calls += 1
+        return [{"id": f"N_{self.calls}", "organizationId": organization_id}]
+
+
+class AsyncOrganizations(Organizations):
+    async def getOrganizationNetworks(self, organization_id, total_pages=1):
+        return Organizations.getOrganizationNetworks(self, organization_id, total_pages)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.invalidate()
+    yield
+    cache.invalidate()
+
+
+def stats(dataset):
+    return next(row for row in cache.cache_stats() if row["Dataset"] == dataset)
+
+
+def test_entries_are_reused_until_they_expire(monkeypatch):
+    dashboard = SimpleNamespace(organizations=Organizations())
+    hits, misses = stats("networks")["Hits"], stats("networks")["Misses"]
+
+    first = cache.get_networks(dashboard, "1")
+    assert cache.get_networks(dashboard, "1") is first
+    assert dashboard.organizations.calls == 1
+    assert stats("networks")["Hits"] == hits + 1
+    assert stats("networks")["Misses"] == misses + 1
+
+    monkeypatch.setitem(cache.cache_ttl_seconds, "networks", 0)
+    assert cache.get_networks(dashboard, "1") != first
+    assert dashboard.organizations.calls == 2
+
+
+def test_entries_are_per_organization():
+    dashboard = SimpleNamespace(organizations=Organizations())
+    cache.get_networks(dashboard, "1")
+    cache.get_networks(dashboard, "2")
+    assert dashboard.organizations.calls == 2
+
+
+def test_invalidate_drops_the_entries_of_an_organization():
+    dashboard = SimpleNamespace(organizations=Organizations())
+    cache.get_networks(dashboard, "1")
+    cache.get_networks(dashboard, "2")
+    cache.invalidate("networks", "1")
+    cache.get_networks(dashboard, "1")
+    cache.get_networks(dashboard, "2")
+    assert dashboard.organizations.calls == 3
+
+
+def test_refresh_replaces_a_fresh_entry():
+    dashboard = SimpleNamespace(organizations=Organizations())
+    cache.get_networks(dashboard, "1")
+    refreshed = cache.refresh("networks", dashboard, "1")
+    assert cache.get_networks(dashboard, "1") is refreshed
+    assert dashboard.organizations.calls == 2
+
+
+def test_sync_and_async_crawls_share_the_entries():
+    aio_dashboard = SimpleNamespace(organizations=AsyncOrganizations())
+    dashboard = SimpleNamespace(organizations=Organizations())
+
+    value = asyncio.run(cache.get_dataset_async("networks", aio_dashboard, "1"))
+    assert cache.get_networks(dashboard, "1") is value
+    assert aio_dashboard.organizations.calls == 1
+    assert dashboard.organizations.calls == 0
+
+
+def test_registered_datasets_take_extra_arguments():
+    calls = []
+
+    def fetch(dashboard, organization_id, product_type):
+        calls.append(product_type)
+        return frozenset([product_type])
+
+    cache.register_dataset("test_product_dataset", fetch)
+    cache.cache_ttl_seconds.setdefault("test_product_dataset", 60)
+
+    for product_type in ("switch", "switch", "wireless"):
+        cache.get_dataset("test_product_dataset", None, "1", product_type)
+    assert calls == ["switch", "wireless"]
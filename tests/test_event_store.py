@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import event_store
+from timeline import time_key
+
+ORGANIZATION_ID = "1"
+NETWORK_ID = "N_1"
+
+
+class Networks:
+    """getNetworkEvents of a DashboardAPI, paging forward through a sorted log."""
+
+    def __init__(self, events, page_size=50):
+        self.events = events
+        self.page_size = page_size
+        self.calls = 0
+
+    def getNetworkEvents(self, network_id, productType, perPage=1000, **kwargs):
+        self.calls += 1
+        cursor = time_key(kwargs.get("startingAfter", ""))
+        page = [
+            event for event in self.events if time_key(event["occurredAt"]) > cursor
+        ][: self.page_size]
+        return {
+            "events": page,
+            "pageStartAt": page[0]["occurredAt"] if page else None,
+            "pageEndAt": page[-1]["occurredAt"] if page else None,
+        }
+
+
+def iso(when):
+    return when.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def busy_network(days=5, every_minutes=10):
+    """An event every 10 minutes over the last days, oldest first."""
+    now = datetime.now(timezone.utc)
+    count = days * 24 * 60 // every_minutes
+    return [
+        {
+            "occurredAt": iso(now - timedelta(minutes=every_minutes * i + 5)),
+            "type": "dhcp_lease",
+            "description": "DHCP lease",
+            "clientId": f"k{i}",
+        }
+        for i in reversed(range(count))
+    ]
+
+
+def since_hours(hours):
+    return (datetime.now(timezone.utc) - timedelta(hours=hours)).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def stored_count(since=None):
+    by_description, _ = event_store.count_events(
+        ORGANIZATION_ID, "appliance", ["dhcp_lease"], since
+    )
+    return sum(count for _, count in by_description)
+
+
+def watermark():
+    with event_store.connect() as connection:
+        return event_store.get_watermark(connection, NETWORK_ID, "appliance")
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(event_store, "event_store_path", str(tmp_path / "events.db"))
+    monkeypatch.setattr(event_store, "event_store_min_sync_interval", 0)
+    monkeypatch.setattr(event_store, "event_store_max_pages", None)
+
+
+def sync(dashboard, since=None):
+    return event_store.sync_network(
+        dashboard, ORGANIZATION_ID, NETWORK_ID, "appliance", since
+    )
+
+
+def test_a_sync_stores_the_events_of_the_window():
+    dashboard = SimpleNamespace(networks=Networks(busy_network()))
+    since = since_hours(24)
+
+    assert sync(dashboard, since) is True
+    assert stored_count(since) == 24 * 6
+    assert watermark()[2] is True
+
+
+def test_capped_syncs_start_at_the_counted_window(monkeypatch):
+    # Starting at the retention start, two pages of a busy network would not
+    # reach the last 24 hours
+    monkeypatch.setattr(event_store, "event_store_max_pages", 2)
+    dashboard = SimpleNamespace(networks=Networks(busy_network()))
+    since = since_hours(24)
+
+    assert sync(dashboard, since) is False
+    assert stored_count(since) == 100
+    assert watermark()[2] is False
+
+    # The next syncs continue from the watermark
+    assert sync(dashboard, since) is True
+    assert stored_count(since) == 24 * 6
+    assert watermark()[2] is True
+
+
+def test_the_watermark_moves_past_the_stored_events():
+    events = busy_network(days=1)
+    dashboard = SimpleNamespace(networks=Networks(events))
+    sync(dashboard)
+    calls = dashboard.networks.calls
+
+    sync(dashboard)
+    assert watermark()[0] == events[-1]["occurredAt"]
+    # A single empty page after the watermark
+    assert dashboard.networks.calls == calls + 1
+    assert stored_count() == len(events)
+
+
+def test_syncs_within_the_minimum_interval_are_skipped(monkeypatch):
+    monkeypatch.setattr(event_store, "event_store_max_pages", 1)
+    dashboard = SimpleNamespace(networks=Networks(busy_network()))
+    assert sync(dashboard) is False
+
+    monkeypatch.setattr(event_store, "event_store_min_sync_interval", 3600)
+    calls = dashboard.networks.calls
+    assert sync(dashboard) is False
+    assert dashboard.networks.calls == calls
+
+
+def test_events_are_stored_once():
+    event = {
+        "occurredAt": "2024-05-01T10:00:00.000000Z",
+        "type": "dhcp_lease",
+        "description": "DHCP lease",
+    }
+    other = dict(event, description="DHCP lease renewed")
+    since = "2024-05-01T00:00:00Z"
+
+    event_store.store_events(ORGANIZATION_ID, NETWORK_ID, "appliance", [event])
+    event_store.store_events(
+        ORGANIZATION_ID, NETWORK_ID, "appliance", [event, dict(event), other]
+    )
+
+    by_description, by_network = event_store.count_events(
+        ORGANIZATION_ID, "appliance", ["dhcp_lease"], since
+    )
+    assert sorted(by_description) == [("DHCP lease", 1), ("DHCP lease renewed", 1)]
+    assert sorted(by_network) == [
+        (NETWORK_ID, "DHCP lease", 1),
+        (NETWORK_ID, "DHCP lease renewed", 1),
+    ]
+
+
+def test_prune_drops_the_events_before_the_retention_start():
+    events = [
+        {"occurredAt": "2000-01-01T00:00:00Z", "type": "dhcp_lease"},
+        {"occurredAt": iso(datetime.now(timezone.utc)), "type": "dhcp_lease"},
+    ]
+    event_store.store_events(ORGANIZATION_ID, NETWORK_ID, "appliance", events)
+    event_store.prune(ORGANIZATION_ID)
+    assert stored_count(since="1970-01-01T00:00:00Z") == 1
+
+
+def test_no_event_types_count_nothing():
+    assert event_store.count_events(ORGANIZATION_ID, "appliance", []) == ([], [])
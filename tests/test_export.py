@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from export import export_columns, flatten, write_csv, write_jsonl
+from reports import report_columns
+
+
+def read_csv(out):
+    return list(csv.DictReader(io.StringIO(out.getvalue())))
+
+
+def test_flatten_nested_dicts_and_lists():
+    row = {"serial": "Q-1", "general": {"name": "MX", "tags": ["a", "b"]}}
+    assert flatten(row) == {
+        "serial": "Q-1",
+        "general.name": "MX",
+        "general.tags": '["a", "b"]',
+    }
+
+
+def test_write_jsonl():
+    out = io.StringIO()
+    rows = [{"a": 1}, {"b": {"c": None}}]
+    assert write_jsonl(iter(rows), out) == 2
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == rows
+
+
+def test_csv_header_has_the_columns_of_every_row():
+    out = io.StringIO()
+    rows = [{"day": "2024-05-01", "200": 3}, {"day": "2024-05-02", "429": 1}]
+
+    assert write_csv(iter(rows), out) == 2
+    assert out.getvalue().splitlines()[0] == "day,200,429"
+    assert read_csv(out) == [
+        {"day": "2024-05-01", "200": "3", "429": ""},
+        {"day": "2024-05-02", "200": "", "429": "1"},
+    ]
+
+
+def test_csv_with_columns_is_written_as_rows_arrive():
+    out = io.StringIO()
+
+    def rows():
+        yield {"name": "HQ", "details": {"id": "N_1"}}
+        # The first row was written before the second is produced
+        assert "HQ,N_1" in out.getvalue()
+        yield {"name": "Branch"}
+
+    assert write_csv(rows(), out, ["name", "details.id"]) == 2
+    assert read_csv(out) == [
+        {"name": "HQ", "details.id": "N_1"},
+        {"name": "Branch", "details.id": ""},
+    ]
+
+
+def test_csv_rows_with_an_undeclared_column_are_rejected():
+    with pytest.raises(ValueError):
+        write_csv([{"name": "HQ", "extra": 1}], io.StringIO(), ["name"])
+
+
+def test_empty_csv():
+    out = io.StringIO()
+    assert write_csv(iter([]), out) == 0
+    assert out.getvalue() == ""
+    assert write_csv(iter([]), out, ["name"]) == 0
+    assert out.getvalue().strip() == "name"
+
+
+def test_export_columns():
+    report = next(iter(report_columns))
+    columns = report_columns[report]
+    assert export_columns(SimpleNamespace(report=report, orgs=None)) == columns
+    assert export_columns(SimpleNamespace(report=report, orgs="all")) == [
+        "organizationId",
+        *columns,
+    ]
+    assert export_columns(SimpleNamespace(report="api_usage", orgs="all")) is None
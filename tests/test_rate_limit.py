@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from rate_limit import TokenBucket
+
+
+def test_the_burst_capacity_is_served_without_waiting():
+    bucket = TokenBucket(rate=10, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_callers_beyond_the_capacity_wait_for_the_refill():
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.reserve()
+    bucket.reserve()
+    # Tokens come every 1 / rate seconds, each caller queues behind the last
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.02)
+
+
+def test_tokens_refill_up_to_the_capacity(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("rate_limit.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.reserve()
+    bucket.reserve()
+    now[0] += 60
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.1)
+
+
+def test_waits_are_recorded_per_queue():
+    bucket = TokenBucket(rate=100, capacity=1)
+    bucket.acquire("getOrganizationNetworks")
+    bucket.acquire("getOrganizationNetworks")
+    asyncio.run(bucket.acquire_async("getNetworkEvents"))
+
+    stats = bucket.stats()
+    assert stats["getOrganizationNetworks"]["calls"] == 2
+    assert stats["getOrganizationNetworks"]["max_wait"] > 0
+    assert stats["getNetworkEvents"]["calls"] == 1
@@ -0,0 +1,48 @@
+from snapshot import OrgSnapshot, group_by, index_by
+
+networks = [
+    {"id": "N_1", "name": "HQ", "productTypes": ["appliance", "switch"]},
+    {"id": "N_2", "name": "Branch", "productTypes": ["switch"]},
+]
+devices = [
+    {"serial": "Q-1", "networkId": "N_1", "productType": "appliance"},
+    {"serial": "Q-2", "networkId": "N_1", "productType": "switch"},
+    {"serial": "Q-3", "networkId": "N_2", "productType": "switch"},
+]
+uplinks = [
+    {"serial": "Q-1", "networkId": "N_1", "uplinks": []},
+]
+
+
+def test_index_by_keeps_the_first_item_of_a_key():
+    items = [{"k": 1, "v": "a"}, {"k": 1, "v": "b"}, {"v": "c"}]
+    assert index_by(items, "k") == {1: items[0], None: items[2]}
+
+
+def test_group_by_keeps_the_original_order():
+    items = [{"k": 1, "v": "a"}, {"k": 2}, {"k": 1, "v": "b"}]
+    assert group_by(items, "k") == {1: [items[0], items[2]], 2: [items[1]]}
+
+
+def test_snapshot_indexes():
+    snapshot = OrgSnapshot(
+        networks=networks, devices=devices, appliance_uplink_statuses=uplinks
+    )
+
+    assert snapshot.networks_by_id["N_2"] is networks[1]
+    assert snapshot.networks_by_product_type == {
+        "appliance": [networks[0]],
+        "switch": networks,
+    }
+    assert snapshot.devices_by_serial["Q-3"] is devices[2]
+    assert snapshot.devices_by_network["N_1"] == devices[:2]
+    assert snapshot.devices_by_product_type["switch"] == devices[1:]
+    assert snapshot.uplinks_by_network == {"N_1": uplinks}
+    assert snapshot.availability_by_serial == {}
+
+
+def test_network_name_of_an_unknown_network():
+    snapshot = OrgSnapshot(networks=networks)
+    assert snapshot.network_name("N_1") == "HQ"
+    assert snapshot.network_name("N_9") == "Unknown"
+    assert snapshot.network_name("N_9", default="-") == "-"
@@ -0,0 +1,60 @@
+from event_correlation import StatusHistoryIndex
+from timeline import batched, merge_timeline, time_key
+
+
+def rows(*times):
+    return [{"Time": time} for time in times]
+
+
+def test_time_key_ignores_sub_seconds_and_zone_suffix():
+    assert time_key("2024-05-01T10:00:00.123456Z") == time_key("2024-05-01T10:00:00Z")
+    assert time_key("2024-05-01T10:00:00Z") < time_key("2024-05-01T10:00:01.000Z")
+
+
+def test_merge_timeline_orders_rows_of_every_source():
+    alerts = rows("2024-05-01T10:00:00.000000Z", "2024-05-01T10:05:00.000000Z")
+    events = rows("2024-05-01T09:59:59Z", "2024-05-01T10:00:00.5Z")
+    changes = rows("2024-05-01T10:01:00+00:00")
+
+    merged = [row["Time"] for row in merge_timeline(alerts, events, changes)]
+
+    assert [time_key(time) for time in merged] == sorted(map(time_key, merged))
+    assert merged[0] == "2024-05-01T09:59:59Z"
+    assert merged[-1] == "2024-05-01T10:05:00.000000Z"
+
+
+def test_merge_timeline_is_lazy():
+    def stream():
+        yield {"Time": "2024-05-01T10:00:00Z"}
+        raise AssertionError("read past the first row")
+
+    merged = merge_timeline(stream(), rows("2024-05-01T11:00:00Z"))
+    assert next(merged)["Time"] == "2024-05-01T10:00:00Z"
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def status_change(serial, ts):
+    return {"device": {"serial": serial}, "ts": ts}
+
+
+def test_status_history_is_sorted_on_the_merge_key():
+    index = StatusHistoryIndex()
+    index.add(
+        [
+            status_change("Q-1", "2024-05-01T10:00:01Z"),
+            status_change("Q-1", "2024-05-01T10:00:00.900Z"),
+        ]
+    )
+    index.add([status_change("Q-1", "2024-05-01T09:00:00Z")])
+
+    window = index.window("Q-1", "2024-05-01T09:30:00Z", "2024-05-01T10:00:01Z")
+
+    assert [change["ts"] for change in window] == [
+        "2024-05-01T10:00:00.900Z",
+        "2024-05-01T10:00:01Z",
+    ]
+    assert index.window("Q-2", "2024-05-01T00:00:00Z", "2024-05-02T00:00:00Z") == []